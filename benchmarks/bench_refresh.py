@@ -0,0 +1,207 @@
+"""山西地电用电查询 - 刷新流程基准测试
+
+基于本地模拟服务器（stub_server.py）驱动 SxgjdlApiClient 和
+SxgjdlDataCoordinator._async_update_data，模拟 1~500 个户号，输出
+刷新耗时 p50/p99、每次刷新的请求数/字节数以及每户内存占用。
+
+示例：
+    python benchmarks/bench_refresh.py --accounts 1 10 100 500 --latency 0.2
+    python benchmarks/bench_refresh.py --mode client --error-rate 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stub_server import StubConfig, StubServer  # noqa: E402
+
+from custom_components.sxgjdl_power.api import SxgjdlApiClient, SxgjdlApiError  # noqa: E402
+
+
+@dataclass
+class BenchResult:
+    accounts: int
+    refreshes: int
+    p50_ms: float
+    p99_ms: float
+    requests_per_refresh: float
+    bytes_per_refresh: float
+    kib_per_account: float
+    wall_s: float
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _create_hass(config_dir: str):
+    """创建最小化的 HomeAssistant 实例（协调器与存储助手需要）"""
+    from homeassistant.core import HomeAssistant
+
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:  # 旧版本构造函数不接受 config_dir
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    return hass
+
+
+async def _client_refresh(client: SxgjdlApiClient) -> None:
+    """客户端模式：并发请求协调器用到的五个接口"""
+    results = await asyncio.gather(
+        client.get_fees(),
+        client.get_record_list(),
+        client.get_days_of_month(),
+        client.get_days_only_data(),
+        client.get_list_by_year(),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, SxgjdlApiError):
+            raise result
+
+
+async def run_once(
+    server: StubServer,
+    accounts: int,
+    rounds: int,
+    mode: str,
+    parallel: int,
+    rate_limit: bool,
+) -> BenchResult:
+    import aiohttp
+
+    server.reset_counters()
+    durations: list[float] = []
+    semaphore = asyncio.Semaphore(parallel)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = None
+        rate_limiter = None
+        if mode == "coordinator" or rate_limit:
+            hass = await _create_hass(config_dir)
+        if rate_limit:
+            from custom_components.sxgjdl_power.scheduler import async_get_scheduler
+
+            rate_limiter = async_get_scheduler(hass).rate_limiter
+
+        tracemalloc.start()
+        mem_before = tracemalloc.get_traced_memory()[0]
+
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=parallel, ttl_dns_cache=600)
+        ) as session:
+            targets = []
+            for index in range(accounts):
+                client = SxgjdlApiClient(
+                    cons_no=f"{index:010d}",
+                    org_no="144160206",
+                    session=session,
+                    rate_limiter=rate_limiter,
+                    base_url=server.base_url,
+                )
+                if mode == "coordinator":
+                    from custom_components.sxgjdl_power.coordinator import SxgjdlDataCoordinator
+                    from custom_components.sxgjdl_power.history import SxgjdlHistoryStore
+
+                    history = SxgjdlHistoryStore(hass, client)
+                    targets.append(SxgjdlDataCoordinator(hass, client, history, 60))
+                else:
+                    targets.append(client)
+
+            async def _refresh(target) -> None:
+                async with semaphore:
+                    start = time.perf_counter()
+                    if mode == "coordinator":
+                        try:
+                            await target._async_update_data()  # noqa: SLF001
+                        except Exception:  # noqa: BLE001 - UpdateFailed 计入耗时即可
+                            pass
+                    else:
+                        await _client_refresh(target)
+                    durations.append(time.perf_counter() - start)
+
+            wall_start = time.perf_counter()
+            for _ in range(rounds):
+                await asyncio.gather(*(_refresh(t) for t in targets))
+            wall = time.perf_counter() - wall_start
+
+            mem_after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del targets
+
+        if hass is not None:
+            await hass.async_stop(force=True)
+
+    refreshes = accounts * rounds
+    return BenchResult(
+        accounts=accounts,
+        refreshes=refreshes,
+        p50_ms=statistics.median(durations) * 1000,
+        p99_ms=_percentile(durations, 99) * 1000,
+        requests_per_refresh=server.total_requests / refreshes,
+        bytes_per_refresh=server.bytes_sent / refreshes,
+        kib_per_account=(mem_after - mem_before) / accounts / 1024,
+        wall_s=wall,
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = StubServer(
+        StubConfig(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            maintenance=args.maintenance,
+        )
+    )
+    await server.start()
+    print(
+        f"mode={args.mode} latency={args.latency}s error_rate={args.error_rate} "
+        f"rounds={args.rounds} parallel={args.parallel} rate_limit={args.rate_limit}"
+    )
+    print(
+        f"{'accounts':>8} {'p50 ms':>9} {'p99 ms':>9} {'req/refresh':>12} "
+        f"{'bytes/refresh':>14} {'KiB/account':>12} {'wall s':>8}"
+    )
+    try:
+        for accounts in args.accounts:
+            r = await run_once(
+                server, accounts, args.rounds, args.mode, args.parallel, args.rate_limit
+            )
+            print(
+                f"{r.accounts:>8} {r.p50_ms:>9.1f} {r.p99_ms:>9.1f} "
+                f"{r.requests_per_refresh:>12.2f} {r.bytes_per_refresh:>14.0f} "
+                f"{r.kib_per_account:>12.1f} {r.wall_s:>8.2f}"
+            )
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="山西地电刷新流程基准测试")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--mode", choices=("coordinator", "client"), default="coordinator")
+    parser.add_argument("--rounds", type=int, default=1, help="每个户号刷新次数（第 2 次起命中缓存）")
+    parser.add_argument("--parallel", type=int, default=50, help="同时刷新的户号数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务器平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 概率")
+    parser.add_argument("--maintenance", action="store_true", help="模拟服务器维护")
+    parser.add_argument("--rate-limit", action="store_true", help="启用全局令牌桶限流")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
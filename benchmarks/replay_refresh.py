@@ -0,0 +1,170 @@
+"""山西地电用电查询 - 录制/回放刷新流程
+
+record：驱动 SxgjdlDataCoordinator 刷新，通过 CassetteRecorder 把每次
+请求/响应写入录制文件。默认请求本地模拟服务器，--base-url 可指向线上
+服务器以录制真实流量（1 月的上年查询、维护时段、空 data 等）。
+
+replay：用 CassetteReplayer 离线回放录制文件，全速运行，不访问网络。
+加 --warp-days 时使用模拟时钟，从录制开始时间起按 --step-minutes 推进，
+由协调器自行判断哪些接口到期，几秒内跑完一个月的刷新。
+
+示例：
+    python benchmarks/replay_refresh.py record /tmp/sxgjdl.jsonl.gz --rounds 3
+    python benchmarks/replay_refresh.py replay /tmp/sxgjdl.jsonl.gz
+    python benchmarks/replay_refresh.py replay /tmp/sxgjdl.jsonl.gz --warp-days 30
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_refresh import _create_hass, _percentile  # noqa: E402
+from stub_server import StubConfig, StubServer  # noqa: E402
+
+from custom_components.sxgjdl_power.api import SxgjdlApiClient  # noqa: E402
+from custom_components.sxgjdl_power.coordinator import SxgjdlDataCoordinator  # noqa: E402
+from custom_components.sxgjdl_power.history import SxgjdlHistoryStore  # noqa: E402
+from custom_components.sxgjdl_power.transport import (  # noqa: E402
+    CassetteRecorder,
+    CassetteReplayer,
+    HttpTransport,
+    SimulatedClock,
+    load_cassette,
+)
+
+CONS_NO = "0209605903"
+ORG_NO = "144160206"
+
+
+async def _refresh(coordinator: SxgjdlDataCoordinator, durations: list[float]) -> None:
+    start = time.perf_counter()
+    try:
+        await coordinator._async_update_data()  # noqa: SLF001
+    except Exception as err:  # noqa: BLE001 - UpdateFailed 计入耗时并继续
+        print(f"  刷新失败: {err}")
+    durations.append(time.perf_counter() - start)
+
+
+async def _record(args: argparse.Namespace) -> None:
+    import aiohttp
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = StubServer(StubConfig(latency=args.latency, error_rate=args.error_rate))
+        base_url = await server.start()
+
+    durations: list[float] = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await _create_hass(config_dir)
+        async with aiohttp.ClientSession() as session:
+            async def _session() -> aiohttp.ClientSession:
+                return session
+
+            client = SxgjdlApiClient(
+                args.cons_no,
+                args.org_no,
+                session=session,
+                transport=CassetteRecorder(HttpTransport(_session, base_url), args.cassette),
+            )
+            coordinator = SxgjdlDataCoordinator(
+                hass, client, SxgjdlHistoryStore(hass, client), 60
+            )
+            try:
+                for _ in range(args.rounds):
+                    await _refresh(coordinator, durations)
+                    if args.interval:
+                        await asyncio.sleep(args.interval)
+            finally:
+                # 写出缓冲中的录制记录
+                await client.close()
+        await hass.async_stop(force=True)
+
+    if server is not None:
+        await server.stop()
+    print(f"已录制 {len(durations)} 次刷新到 {args.cassette}")
+
+
+async def _replay(args: argparse.Namespace) -> None:
+    entries = load_cassette(args.cassette)
+    if not entries:
+        print("录制文件为空")
+        return
+
+    clock = None
+    if args.warp_days:
+        clock = SimulatedClock(min(datetime.fromisoformat(e["t"]) for e in entries))
+    transport = CassetteReplayer(entries, clock=clock, replay_latency=args.replay_latency)
+
+    durations: list[float] = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await _create_hass(config_dir)
+        client = SxgjdlApiClient(args.cons_no, args.org_no, transport=transport)
+        coordinator = SxgjdlDataCoordinator(
+            hass, client, SxgjdlHistoryStore(hass, client), 60,
+            adaptive_polling=args.adaptive,
+        )
+        wall_start = time.perf_counter()
+        if clock is None:
+            for _ in range(args.rounds):
+                await _refresh(coordinator, durations)
+        else:
+            step = timedelta(minutes=args.step_minutes)
+            end = clock.now() + timedelta(days=args.warp_days)
+            while clock.now() < end:
+                if coordinator.refresh_due:
+                    await _refresh(coordinator, durations)
+                clock.advance(step)
+        wall = time.perf_counter() - wall_start
+        await hass.async_stop(force=True)
+
+    requests = sum(s["requests"] for s in client.stats.as_dict().values())
+    print(
+        f"回放 {len(entries)} 条录制，刷新 {len(durations)} 次，请求 {requests} 次，"
+        f"未命中 {transport.misses} 次，耗时 {wall:.2f} 秒"
+    )
+    if durations:
+        print(
+            f"刷新耗时 p50 {statistics.median(durations) * 1000:.1f} ms，"
+            f"p99 {_percentile(durations, 99) * 1000:.1f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="山西地电刷新流程录制/回放")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="录制刷新流量")
+    record.add_argument("cassette", help="录制文件（.jsonl.gz，追加写入）")
+    record.add_argument("--base-url", help="服务器地址，默认启动本地模拟服务器")
+    record.add_argument("--rounds", type=int, default=1, help="刷新次数")
+    record.add_argument("--interval", type=float, default=0.0, help="两次刷新间隔（秒）")
+    record.add_argument("--latency", type=float, default=0.05, help="模拟服务器平均延迟（秒）")
+    record.add_argument("--error-rate", type=float, default=0.0, help="模拟服务器 HTTP 500 概率")
+
+    replay = sub.add_parser("replay", help="离线回放录制文件")
+    replay.add_argument("cassette", help="录制文件（.jsonl.gz）")
+    replay.add_argument("--rounds", type=int, default=1, help="不加 --warp-days 时的刷新次数")
+    replay.add_argument("--warp-days", type=float, default=0, help="按模拟时钟回放的天数")
+    replay.add_argument("--step-minutes", type=float, default=1, help="模拟时钟每步推进的分钟数")
+    replay.add_argument("--adaptive", action="store_true", help="启用自适应轮询")
+    replay.add_argument("--replay-latency", action="store_true", help="按录制耗时等待")
+
+    for sub_parser in (record, replay):
+        sub_parser.add_argument("--cons-no", default=CONS_NO)
+        sub_parser.add_argument("--org-no", default=ORG_NO)
+
+    args = parser.parse_args()
+    asyncio.run(_record(args) if args.command == "record" else _replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""山西地电用电查询 - 本地模拟服务器
+
+按 fixtures/ 下录制的响应模拟 wechart-platform-web 的六个接口，
+可配置延迟、错误率和维护状态，用于离线测量刷新性能。
+
+单独运行：
+    python benchmarks/stub_server.py --port 8765 --latency 0.2 --error-rate 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import calendar
+import copy
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+PREFIX = "/wechart-platform-web"
+
+ENDPOINTS = (
+    "getFeesByConsNo",
+    "getConsInfoByConsNo",
+    "getRecordList",
+    "getListByYear",
+    "getDaysOfMonthData",
+    "getDaysOnlyData",
+)
+
+MAINTENANCE_PAGE = "<html><body>系统维护中，请稍后再试</body></html>"
+
+
+@dataclass
+class StubConfig:
+    """模拟服务器行为"""
+
+    latency: float = 0.05          # 平均延迟（秒）
+    jitter: float = 0.5            # 延迟抖动比例，0.5 表示 ±50%
+    error_rate: float = 0.0        # 返回 HTTP 500 的概率
+    maintenance: bool = False      # 所有接口返回维护页面
+    endpoint_latency: dict[str, float] = field(default_factory=dict)  # 单接口延迟覆盖
+
+
+class StubServer:
+    """基于录制数据的模拟服务器"""
+
+    def __init__(self, config: StubConfig | None = None) -> None:
+        self.config = config or StubConfig()
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self._fixtures = {
+            name: json.loads((FIXTURE_DIR / f"{name}.json").read_text(encoding="utf-8"))
+            for name in ENDPOINTS
+        }
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+        self.bytes_sent = 0
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def _payload(self, name: str, query: dict[str, str]) -> dict:
+        payload = copy.deepcopy(self._fixtures[name])
+        data = payload.get("data")
+        cons_no = query.get("consNo")
+        if isinstance(data, dict) and cons_no and "consNo" in data:
+            data["consNo"] = cons_no
+        if name == "getDaysOfMonthData":
+            # 录制数据只保存日，按请求的月份补全 ymd，当月只返回到昨天
+            year_month = query.get("date", date.today().strftime("%Y%m"))
+            year, month = int(year_month[:4]), int(year_month[4:6])
+            last_day = calendar.monthrange(year, month)[1]
+            if year_month == date.today().strftime("%Y%m"):
+                last_day = date.today().day - 1
+            days = []
+            for entry in data:
+                day = int(entry["ymd"])
+                if day <= last_day:
+                    days.append({
+                        **entry,
+                        "ymd": f"{year_month}{day:02d}",
+                        "lastMrDate": f"{year_month}{day:02d}",
+                    })
+            payload["data"] = days
+        return payload
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        name = request.match_info["endpoint"]
+        if name not in self._fixtures:
+            raise web.HTTPNotFound()
+        self.requests[name] += 1
+
+        cfg = self.config
+        latency = cfg.endpoint_latency.get(name, cfg.latency)
+        if latency > 0:
+            await asyncio.sleep(latency * random.uniform(1 - cfg.jitter, 1 + cfg.jitter))
+
+        if cfg.maintenance:
+            return web.Response(text=MAINTENANCE_PAGE, content_type="text/html")
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            raise web.HTTPInternalServerError()
+
+        body = json.dumps(self._payload(name, dict(request.query)), ensure_ascii=False)
+        self.bytes_sent += len(body.encode())
+        return web.Response(text=body, content_type="application/json")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """启动服务器，返回可传给 SxgjdlApiClient 的 base_url"""
+        app = web.Application()
+        app.router.add_get(PREFIX + "/{endpoint}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets  # noqa: SLF001 - 获取实际绑定端口
+        bound_port = sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}{PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = StubServer(
+        StubConfig(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            maintenance=args.maintenance,
+        )
+    )
+    base_url = await server.start(args.host, args.port)
+    print(f"模拟服务器已启动: {base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="山西地电接口模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 概率")
+    parser.add_argument("--maintenance", action="store_true", help="返回维护页面")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
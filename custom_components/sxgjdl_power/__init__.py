@@ -1,13 +1,21 @@
 """山西地电用电查询 - Home Assistant 集成"""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .api import SxgjdlApiClient, SxgjdlApiError
+from .api import SxgjdlApiClient
 from .const import (
     DOMAIN,
     CONF_CONS_NO,
@@ -15,13 +23,40 @@ from .const import (
     CONF_OPEN_ID,
     CONF_SCAN_INTERVAL,
     DEFAULT_SCAN_INTERVAL,
+    ENDPOINT_TTL_OPTIONS,
+    CONF_ADAPTIVE_POLLING,
+    DEFAULT_ADAPTIVE_POLLING,
+    DATA_VALIDATED,
+    VALIDATION_REUSE_WINDOW,
 )
-from .coordinator import SxgjdlDataCoordinator
+from .coordinator import (
+    SNAPSHOT_STORAGE_VERSION,
+    SxgjdlDataCoordinator,
+    snapshot_storage_key,
+)
+from .history import STORAGE_VERSION, SxgjdlHistoryStore, history_storage_key
+from .scheduler import async_get_scheduler, async_release_scheduler
+from .services import async_setup_services
+from .session import async_acquire_session, async_release_session
+from .statistics import STATISTICS_STORAGE_VERSION, statistics_storage_key
+from .websocket import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# 长期统计增量导入间隔
+STATISTICS_IMPORT_INTERVAL = timedelta(days=1)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """注册集成服务与 WebSocket 命令"""
+    async_setup_services(hass)
+    async_register_websocket_commands(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """初始化集成"""
@@ -33,28 +68,67 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
     )
 
-    client = SxgjdlApiClient(cons_no=cons_no, org_no=org_no, open_id=open_id)
-
-    # 验证连接
+    # 所有户号共用同一个连接池、调度器和全局限流
+    session = async_acquire_session(hass)
+    scheduler = async_get_scheduler(hass)
+    client = SxgjdlApiClient(
+        cons_no=cons_no,
+        org_no=org_no,
+        open_id=open_id,
+        session=session,
+        rate_limiter=scheduler.rate_limiter,
+    )
     try:
-        valid = await client.validate_connection()
-        if not valid:
-            await client.close()
-            raise ConfigEntryNotReady(f"户号 {cons_no} 验证失败，请检查配置")
-    except SxgjdlApiError as err:
-        await client.close()
-        raise ConfigEntryNotReady(f"无法连接到山西地电服务器: {err}") from err
-
-    coordinator = SxgjdlDataCoordinator(hass, client, scan_interval)
-
-    # 首次刷新
-    await coordinator.async_config_entry_first_refresh()
-
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
-
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        history = SxgjdlHistoryStore(hass, client)
+        await history.async_load()
+
+        endpoint_ttls = {
+            path: entry.options.get(conf_key, default)
+            for path, (conf_key, default) in ENDPOINT_TTL_OPTIONS.items()
+        }
+        coordinator = SxgjdlDataCoordinator(
+            hass,
+            client,
+            history,
+            scan_interval,
+            endpoint_ttls,
+            adaptive_polling=entry.options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING),
+        )
+
+        # 有快照：传感器立即用快照数据上线，验证和首次刷新由调度器与其他户号
+        # 错开执行，不阻塞启动；无快照（首次添加）：同步完成首次刷新
+        if not await coordinator.async_restore_snapshot():
+            await _async_first_refresh(hass, coordinator)
+
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+        scheduler.async_register(coordinator)
+
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except BaseException:
+        # 任何异常（含 ConfigEntryNotReady、取消）都要撤销登记并归还连接池引用，
+        # 否则连接池永远不会关闭
+        if hass.data.get(DOMAIN, {}).pop(entry.entry_id, None) is not None:
+            async_release_scheduler(hass, coordinator)
+        await async_release_session(hass)
+        raise
+
+    # 历史月度数据导入长期统计：启动后一次，之后每天增量一次
+    @callback
+    def _async_schedule_statistics_import(_now: datetime | None = None) -> None:
+        entry.async_create_background_task(
+            hass,
+            coordinator.statistics.async_import_monthly(),
+            f"{DOMAIN}_statistics_{cons_no}",
+        )
+
+    _async_schedule_statistics_import()
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass, _async_schedule_statistics_import, STATISTICS_IMPORT_INTERVAL
+        )
+    )
 
-    # 监听选项变更（刷新间隔调整）
+    # 监听选项变更（刷新间隔、缓存有效期调整）
     entry.async_on_unload(entry.add_update_listener(_async_update_options))
 
     return True
@@ -65,10 +139,56 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         coordinator: SxgjdlDataCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
-        await coordinator.client.close()
+        await coordinator.history.async_flush()
+        await coordinator.async_save_snapshot()
+        async_release_scheduler(hass, coordinator)
+        await async_release_session(hass)
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """删除集成时清理历史缓存、快照和统计水位线文件"""
+    cons_no = entry.data[CONF_CONS_NO]
+    await Store(hass, STORAGE_VERSION, history_storage_key(cons_no)).async_remove()
+    await Store(hass, SNAPSHOT_STORAGE_VERSION, snapshot_storage_key(cons_no)).async_remove()
+    await Store(
+        hass, STATISTICS_STORAGE_VERSION, statistics_storage_key(cons_no)
+    ).async_remove()
+
+
+def _pop_validated(hass: HomeAssistant, cons_no: str) -> dict[str, Any] | None:
+    """取出配置流程刚验证过的户号信息（超过复用窗口则丢弃）"""
+    validated = hass.data.get(DATA_VALIDATED, {}).pop(cons_no, None)
+    if validated is None or time.monotonic() - validated[0] > VALIDATION_REUSE_WINDOW:
+        return None
+    return validated[1]
+
+
+async def _async_first_refresh(hass: HomeAssistant, coordinator: SxgjdlDataCoordinator) -> None:
+    """首次刷新
+
+    刚在配置流程中验证过：直接用验证结果预填数据，不再重复验证；
+    否则验证与首次刷新并发进行，不额外增加一轮往返。
+    """
+    cons_no = coordinator.client.cons_no
+    cons_info = _pop_validated(hass, cons_no)
+    if cons_info is not None:
+        coordinator.seed_cons_info(cons_info)
+        await coordinator.async_config_entry_first_refresh()
+        return
+
+    valid, refreshed = await asyncio.gather(
+        coordinator.client.validate_connection(),
+        coordinator.async_config_entry_first_refresh(),
+        return_exceptions=True,
+    )
+    if valid is not True:
+        # validate_connection 在连接失败时同样返回 False
+        raise ConfigEntryNotReady(f"户号 {cons_no} 验证失败，请检查配置或网络连接")
+    if isinstance(refreshed, BaseException):
+        raise refreshed
+
+
 async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """选项变更时重载集成"""
     await hass.config_entries.async_reload(entry.entry_id)
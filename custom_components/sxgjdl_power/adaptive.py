@@ -0,0 +1,156 @@
+"""山西地电用电查询 - 按数据上传时间及余额自适应轮询"""
+from __future__ import annotations
+
+import statistics
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any
+
+# 至少观察到几次数据更新后才开始自适应
+UPLOAD_MIN_SAMPLES = 3
+# 保留最近多少次观察
+UPLOAD_HISTORY = 14
+# 预计上传时间前后的密集轮询窗口及间隔
+DENSE_WINDOW = timedelta(minutes=60)
+DENSE_INTERVAL = timedelta(minutes=10)
+
+# 日均用电的指数平滑窗口（天）
+BURN_RATE_DAYS = 14
+# 余额可用天数分档：低于 CRITICAL/LOW 时加密余额轮询，高于 COMFORT 时放缓
+BALANCE_CRITICAL_DAYS = 3
+BALANCE_LOW_DAYS = 7
+BALANCE_COMFORT_DAYS = 30
+BALANCE_MIN_INTERVAL = timedelta(minutes=15)
+BALANCE_MAX_INTERVAL = timedelta(hours=12)
+
+
+class UploadTimeLearner:
+    """学习服务器每天上传昨日数据的时间点
+
+    每次拉取每日用电后比较 (lastMrDate, 最新 ymd)，发生变化即记录当时的
+    时刻（一天中的分钟数），取最近若干次的中位数作为预计上传时间。
+    """
+
+    def __init__(self) -> None:
+        self._signature: tuple[str, str] | None = None
+        self._minutes: deque[int] = deque(maxlen=UPLOAD_HISTORY)
+        # 最近一次观察到新数据的日期
+        self._arrived_on: date | None = None
+
+    def observe(self, now: datetime, last_mr_date: str, latest_ymd: str) -> None:
+        signature = (last_mr_date or "", latest_ymd or "")
+        if self._signature is not None and signature != self._signature:
+            self._minutes.append(now.hour * 60 + now.minute)
+            self._arrived_on = now.date()
+        self._signature = signature
+
+    @property
+    def expected_minute(self) -> int | None:
+        """预计上传时刻（一天中的分钟数），样本不足时为 None"""
+        if len(self._minutes) < UPLOAD_MIN_SAMPLES:
+            return None
+        return int(statistics.median(self._minutes))
+
+    def ttl(self, fetched_at: datetime, default: timedelta) -> timedelta:
+        """在 fetched_at 拉取的每日用电数据的有效期"""
+        expected = self.expected_minute
+        if expected is None:
+            return default
+
+        midnight = datetime.combine(fetched_at.date(), datetime.min.time(), tzinfo=fetched_at.tzinfo)
+        window_start = midnight + timedelta(minutes=expected) - DENSE_WINDOW
+        window_end = midnight + timedelta(minutes=expected) + DENSE_WINDOW
+
+        if self._arrived_on == fetched_at.date():
+            # 当天的数据已到：稀疏轮询直到次日的窗口
+            return max(default, window_start + timedelta(days=1) - fetched_at)
+        if fetched_at < window_start:
+            # 窗口之前：稀疏轮询，但不错过窗口开始
+            return max(DENSE_INTERVAL, window_start - fetched_at)
+        if fetched_at < window_end:
+            return DENSE_INTERVAL
+        # 窗口已过仍未等到新数据，按默认间隔继续轮询
+        return default
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "signature": list(self._signature) if self._signature else None,
+            "minutes": list(self._minutes),
+            "arrived_on": self._arrived_on.isoformat() if self._arrived_on else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> UploadTimeLearner:
+        learner = cls()
+        if not data:
+            return learner
+        if data.get("signature"):
+            learner._signature = tuple(data["signature"])  # type: ignore[assignment]
+        learner._minutes.extend(data.get("minutes", []))
+        if data.get("arrived_on"):
+            learner._arrived_on = date.fromisoformat(data["arrived_on"])
+        return learner
+
+
+class BurnRateModel:
+    """按每日用电量估算余额耗尽时间
+
+    每出现一个新日期就对日用电量做一次指数平滑（O(1)），
+    乘以当前电价得到每日消耗金额，进而推算余额可用天数。
+    """
+
+    def __init__(self) -> None:
+        self.last_ymd = ""
+        self.kwh_per_day: float | None = None
+        # 上一次预测的输入及结果，输入不变时耗尽时间保持不变
+        self._forecast_key: tuple[float, float] | None = None
+        self._depletion_at: datetime | None = None
+
+    def observe(self, ymd: str, kwh: float) -> None:
+        """计入一天的用电量；只接受比最近一天更新的日期"""
+        if ymd <= self.last_ymd:
+            return
+        self.last_ymd = ymd
+        if self.kwh_per_day is None:
+            self.kwh_per_day = kwh
+        else:
+            alpha = 2 / (BURN_RATE_DAYS + 1)
+            self.kwh_per_day += alpha * (kwh - self.kwh_per_day)
+
+    def forecast(
+        self, balance: float, price: float, now: datetime
+    ) -> tuple[float, datetime] | None:
+        """返回 (可用天数, 预计耗尽时间)；缺少用电或电价数据时为 None"""
+        if not self.kwh_per_day or not price:
+            return None
+        daily_cost = self.kwh_per_day * price
+        days_left = max(balance, 0.0) / daily_cost
+        key = (balance, round(daily_cost, 4))
+        if key != self._forecast_key or self._depletion_at is None:
+            self._forecast_key = key
+            self._depletion_at = now + timedelta(days=days_left)
+        return days_left, self._depletion_at
+
+    @staticmethod
+    def ttl(days_left: float | None, default: timedelta) -> timedelta:
+        """余额接口的缓存有效期：余额越紧张轮询越频繁"""
+        if days_left is None:
+            return default
+        if days_left <= BALANCE_CRITICAL_DAYS:
+            return max(BALANCE_MIN_INTERVAL, default / 4)
+        if days_left <= BALANCE_LOW_DAYS:
+            return max(BALANCE_MIN_INTERVAL, default / 2)
+        if days_left >= BALANCE_COMFORT_DAYS:
+            return max(default, min(default * 4, BALANCE_MAX_INTERVAL))
+        return default
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"last_ymd": self.last_ymd, "kwh_per_day": self.kwh_per_day}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> BurnRateModel:
+        model = cls()
+        if data:
+            model.last_ymd = data.get("last_ymd") or ""
+            model.kwh_per_day = data.get("kwh_per_day")
+        return model
@@ -1,9 +1,15 @@
 """山西地电用电查询 - API 客户端"""
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import time
+from collections.abc import Iterable
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
 
@@ -16,6 +22,12 @@ from .const import (
     API_DAYS_OF_MONTH,
     API_DAYS_ONLY,
 )
+from .resilience import RETRY_ATTEMPTS, CircuitBreaker, backoff_delay
+from .stats import SxgjdlApiStats
+from .transport import HttpTransport, SxgjdlTransport, request_key
+
+if TYPE_CHECKING:
+    from .scheduler import SxgjdlTokenBucket
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,11 +43,80 @@ HEADERS = {
     "Accept-Language": "zh-CN,zh;q=0.9",
 }
 
+# 相同请求完成后的短时复用窗口（秒），0 表示只合并并发请求
+REQUEST_REUSE_WINDOW = 5.0
+
+# 对冲请求：超过该接口历史延迟分位数仍未返回时补发一次相同请求，先返回者为准
+HEDGE_PERCENTILE = 95
+# 样本足够后才启用对冲；补发等待时间不低于下限（秒）
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.5
+
 
 class SxgjdlApiError(Exception):
     """API 调用异常"""
 
 
+class SxgjdlTransientError(SxgjdlApiError):
+    """可重试的瞬时错误（超时、连接失败、5xx、维护页面等）"""
+
+
+class SxgjdlCircuitOpenError(SxgjdlApiError):
+    """接口处于熔断状态，本次请求被跳过"""
+
+
+class SxgjdlDeadlineError(SxgjdlApiError):
+    """超出调用方给定的请求时长预算（不代表服务器故障）"""
+
+
+class RequestBudget:
+    """一组调用共享的请求时长预算（秒），创建时开始计时
+
+    限流等待、重试和对冲请求都占用同一预算，用完后不再发出新请求。
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self._deadline = asyncio.get_running_loop().time() + seconds
+        self.expired = False
+
+    def remaining(self) -> float:
+        """剩余秒数"""
+        return max(0.0, self._deadline - asyncio.get_running_loop().time())
+
+    def exhausted(self) -> bool:
+        if self.remaining() <= 0:
+            self.expired = True
+        return self.expired
+
+
+# 当前调用的请求预算，由调用方（协调器）在各自的任务中设置
+request_budget: ContextVar[RequestBudget | None] = ContextVar(
+    "sxgjdl_request_budget", default=None
+)
+
+
+def _status_error(status: int, message: str = "") -> SxgjdlApiError:
+    """HTTP 错误状态码：5xx 和 429 可重试"""
+    if status >= 500 or status == 429:
+        return SxgjdlTransientError(f"HTTP 错误 {status}: {message}")
+    return SxgjdlApiError(f"HTTP 错误 {status}: {message}")
+
+
+def _wrap_error(err: Exception) -> SxgjdlApiError:
+    """把底层异常转换为 SxgjdlApiError，并区分可重试的瞬时错误"""
+    if isinstance(err, SxgjdlApiError):
+        return err
+    if isinstance(err, aiohttp.ClientConnectorError):
+        return SxgjdlTransientError(f"无法连接到服务器: {err}")
+    if isinstance(err, aiohttp.ClientResponseError):
+        return _status_error(err.status, err.message)
+    if isinstance(err, (asyncio.TimeoutError, aiohttp.ClientError, ValueError)):
+        # 超时、连接中断，或维护期间返回的非 JSON 页面
+        return SxgjdlTransientError(f"请求异常: {err}")
+    return SxgjdlApiError(f"请求异常: {err}")
+
+
 class SxgjdlApiClient:
     """山西地电 API 客户端"""
 
@@ -45,12 +126,34 @@ class SxgjdlApiClient:
         org_no: str,
         open_id: str = "",
         session: aiohttp.ClientSession | None = None,
+        rate_limiter: SxgjdlTokenBucket | None = None,
+        reuse_window: float = REQUEST_REUSE_WINDOW,
+        base_url: str = BASE_URL,
+        hedge_percentile: float | None = HEDGE_PERCENTILE,
+        transport: SxgjdlTransport | None = None,
     ) -> None:
         self.cons_no = cons_no
         self.org_no = org_no
         self.open_id = open_id
         self._session = session
         self._own_session = session is None
+        # 传输层：默认直接请求服务器（base_url 可指向本地模拟服务器），
+        # 也可替换为录制/回放（见 transport.py）
+        self._transport = transport or HttpTransport(self._get_session, base_url)
+        # 全局限流（多户号共享），为 None 时不限流
+        self._rate_limiter = rate_limiter
+        # 请求合并：相同 (path, params) 的并发调用共享同一个进行中的请求
+        self._reuse_window = reuse_window
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        # 每个进行中请求的等待方数量；全部放弃时取消该请求
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._recent: dict[tuple, tuple[float, dict]] = {}
+        # 每个接口一个熔断器
+        self._breakers: dict[str, CircuitBreaker] = {}
+        # 对冲请求的延迟分位数，None 表示关闭
+        self._hedge_percentile = hedge_percentile
+        # 各接口耗时、响应大小、错误与缓存命中统计
+        self.stats = SxgjdlApiStats()
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
@@ -58,25 +161,189 @@ class SxgjdlApiClient:
         return self._session
 
     async def close(self) -> None:
+        await self._transport.close()
         if self._own_session and self._session and not self._session.closed:
             await self._session.close()
 
+    def now(self) -> datetime:
+        """当前本地时间；回放录制文件时为模拟时间"""
+        return self._transport.now()
+
+    def monotonic(self) -> float:
+        """单调时钟（秒）；回放录制文件时随模拟时间推进"""
+        return self._transport.monotonic()
+
+    def forget_recent(self, paths: Iterable[str]) -> None:
+        """丢弃这些接口可复用的最近响应，下次调用必定请求服务器"""
+        paths = set(paths)
+        for key in [k for k in self._recent if k[0] in paths]:
+            del self._recent[key]
+
+    def breaker_states(self) -> dict[str, str]:
+        """各接口熔断器状态（用于诊断）"""
+        return {path: breaker.state for path, breaker in sorted(self._breakers.items())}
+
     async def _get(self, path: str, params: dict) -> dict:
-        """发起 GET 请求并返回解析后的 JSON"""
-        url = BASE_URL + path
-        session = await self._get_session()
+        """发起 GET 请求；相同请求并发时只发一次，短时间内重复调用直接复用结果"""
+        key = request_key(path, params)
+        recent = self._recent.get(key)
+        if recent is not None and self.monotonic() - recent[0] < self._reuse_window:
+            _LOGGER.debug("复用最近响应 %s params=%s", path, params)
+            self.stats.endpoint(path).cache_hits += 1
+            return recent[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.endpoint(path).cache_misses += 1
+            task = asyncio.create_task(self._request(path, params))
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._request_done, key))
+        else:
+            _LOGGER.debug("合并进行中的请求 %s params=%s", path, params)
+            self.stats.endpoint(path).cache_hits += 1
+        # shield：某个调用方被取消时不影响其他等待同一请求的调用方；
+        # 最后一个等待方放弃时取消请求，不在后台继续重试
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _request_done(self, key: tuple, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self._reuse_window <= 0:
+            return
+        now = self.monotonic()
+        # 顺带清理已过期的复用条目
+        for stale in [k for k, (ts, _) in self._recent.items() if now - ts >= self._reuse_window]:
+            del self._recent[stale]
+        self._recent[key] = (now, task.result())
+
+    async def _request(self, path: str, params: dict) -> dict:
+        """带熔断和指数退避重试的请求"""
+        breaker = self._breakers.get(path)
+        if breaker is None:
+            breaker = self._breakers[path] = CircuitBreaker(clock=self.monotonic)
+        if not breaker.allow_request():
+            self.stats.endpoint(path).circuit_open += 1
+            raise SxgjdlCircuitOpenError(
+                f"接口 {path} 连续失败已熔断，{breaker.retry_in:.0f} 秒后重试"
+            )
+        # 半开探测只尝试一次，避免在服务器未恢复时反复等待超时
+        attempts = 1 if breaker.state == "half_open" else RETRY_ATTEMPTS
+        try:
+            for attempt in range(attempts):
+                try:
+                    data = await self._request_hedged(path, params)
+                except SxgjdlTransientError as err:
+                    delay = backoff_delay(attempt)
+                    budget = request_budget.get()
+                    if attempt + 1 >= attempts or (
+                        # 预算不足以等到下一次重试
+                        budget is not None and budget.remaining() <= delay
+                    ):
+                        # 重试用完才计一次失败，熔断阈值按调用次数而非请求次数计
+                        breaker.record_failure()
+                        raise
+                    _LOGGER.debug(
+                        "%s 请求失败（%s），%.1f 秒后第 %d 次重试", path, err, delay, attempt + 1
+                    )
+                    await self._transport.sleep(delay)
+                except SxgjdlDeadlineError:
+                    raise
+                except SxgjdlApiError:
+                    # 非瞬时错误（4xx 等）说明服务器可达，不计入熔断
+                    breaker.record_success()
+                    raise
+                else:
+                    breaker.record_success()
+                    return data
+        finally:
+            # 取消等其他退出路径也要释放半开探测，否则接口会一直停在半开
+            breaker.release_probe()
+        # 循环内必然返回或抛出，这里仅为类型完整
+        raise SxgjdlApiError(f"请求 {path} 失败")
+
+    def _hedge_delay(self, path: str) -> float | None:
+        """补发重复请求前的等待时间（秒）；样本不足或关闭对冲时为 None"""
+        if self._hedge_percentile is None:
+            return None
+        stats = self.stats.endpoint(path)
+        if stats.requests < HEDGE_MIN_SAMPLES:
+            return None
+        threshold = stats.percentile(self._hedge_percentile)
+        if threshold is None:
+            return None
+        return max(threshold / 1000, HEDGE_MIN_DELAY)
+
+    async def _request_hedged(self, path: str, params: dict) -> dict:
+        """慢于历史分位数时补发一次相同请求，取先成功的结果"""
+        delay = self._hedge_delay(path)
+        if delay is None:
+            return await self._request_once(path, params)
+
+        tasks = [asyncio.create_task(self._request_once(path, params))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+            _LOGGER.debug("%s 超过 %.1f 秒未返回，补发对冲请求", path, delay)
+            self.stats.endpoint(path).hedged += 1
+            tasks.append(asyncio.create_task(self._request_once(path, params)))
+            pending: set[asyncio.Task] = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request_once(self, path: str, params: dict) -> dict:
+        """发起一次 GET 请求并返回解析后的 JSON"""
+        budget = request_budget.get()
+        if budget is not None and budget.exhausted():
+            # 预算已用完，不再占用全局限流令牌
+            raise SxgjdlDeadlineError(f"{path} 超出请求时限 {budget.seconds:.0f} 秒")
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+        timeout = None
+        if budget is not None:
+            timeout = budget.remaining()
+            if budget.exhausted():
+                raise SxgjdlDeadlineError(f"{path} 超出请求时限 {budget.seconds:.0f} 秒")
+        stats = self.stats.endpoint(path)
+        start = time.monotonic()
         try:
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                resp.raise_for_status()
-                data = await resp.json(content_type=None)
-                _LOGGER.debug("GET %s params=%s -> %s", path, params, data)
-                return data
-        except aiohttp.ClientConnectorError as err:
-            raise SxgjdlApiError(f"无法连接到服务器: {err}") from err
-        except aiohttp.ClientResponseError as err:
-            raise SxgjdlApiError(f"HTTP 错误 {err.status}: {err.message}") from err
+            status, body = await asyncio.wait_for(self._transport.fetch(path, params), timeout)
+            if status >= 400:
+                raise _status_error(status)
+            data = json.loads(body)
+            stats.record_response((time.monotonic() - start) * 1000, len(body))
+            _LOGGER.debug("GET %s params=%s -> %s", path, params, data)
+            return data
         except Exception as err:
-            raise SxgjdlApiError(f"请求异常: {err}") from err
+            if budget is not None and budget.exhausted():
+                # 调用方时限已到，不是服务器故障，不计入错误统计
+                raise SxgjdlDeadlineError(
+                    f"{path} 超出请求时限 {budget.seconds:.0f} 秒"
+                ) from err
+            stats.record_error(
+                (time.monotonic() - start) * 1000,
+                timeout=isinstance(err, asyncio.TimeoutError),
+            )
+            raise _wrap_error(err) from err
 
     # ------------------------------------------------------------------ #
     #  公开接口                                                             #
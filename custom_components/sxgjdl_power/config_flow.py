@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any
 
 import voluptuous as vol
@@ -19,7 +20,13 @@ from .const import (
     CONF_OPEN_ID,
     CONF_SCAN_INTERVAL,
     DEFAULT_SCAN_INTERVAL,
+    ENDPOINT_TTL_OPTIONS,
+    CONF_ADAPTIVE_POLLING,
+    DEFAULT_ADAPTIVE_POLLING,
+    DATA_VALIDATED,
 )
+from .scheduler import async_get_scheduler
+from .session import async_acquire_session, async_release_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -42,6 +49,9 @@ OPTIONS_SCHEMA = vol.Schema(
     }
 )
 
+# 接口缓存有效期（分钟），最长一周
+TTL_VALIDATOR = vol.All(vol.Coerce(int), vol.Range(min=10, max=10080))
+
 
 class SxgjdlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """配置流程：引导用户填写户号和组织编号"""
@@ -63,17 +73,25 @@ class SxgjdlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self._abort_if_unique_id_configured()
 
             # 验证户号是否有效
-            client = SxgjdlApiClient(cons_no=cons_no, org_no=org_no, open_id=open_id)
+            client = SxgjdlApiClient(
+                cons_no=cons_no,
+                org_no=org_no,
+                open_id=open_id,
+                session=async_acquire_session(self.hass),
+                rate_limiter=async_get_scheduler(self.hass).rate_limiter,
+            )
             try:
-                valid = await client.validate_connection()
-                if not valid:
+                # 一次请求同时完成验证和获取户名
+                cons_info = await client.get_cons_info()
+                if cons_info.get("flag") is not True:
                     errors["base"] = "invalid_cons_no"
                 else:
-                    # 获取户名作为条目标题
-                    cons_info = await client.get_cons_info()
-                    cons_name = ""
-                    if cons_info.get("flag"):
-                        cons_name = (cons_info.get("data") or {}).get("consName", "")
+                    cons_name = (cons_info.get("data") or {}).get("consName", "")
+                    # 交给随后的 async_setup_entry 预填数据，省去一次验证请求
+                    self.hass.data.setdefault(DATA_VALIDATED, {})[cons_no] = (
+                        time.monotonic(),
+                        cons_info,
+                    )
 
                     title = f"山西地电 - {cons_name or cons_no}"
                     return self.async_create_entry(
@@ -90,7 +108,8 @@ class SxgjdlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             except SxgjdlApiError:
                 errors["base"] = "cannot_connect"
             finally:
-                await client.close()
+                # 保留连接池片刻，随后的 async_setup_entry 直接复用
+                await async_release_session(self.hass, linger=True)
 
         return self.async_show_form(
             step_id="user",
@@ -105,7 +124,7 @@ class SxgjdlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
 
 class SxgjdlOptionsFlow(config_entries.OptionsFlow):
-    """选项流程：允许修改刷新间隔"""
+    """选项流程：允许修改刷新间隔及各接口缓存有效期"""
 
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         self.config_entry = config_entry
@@ -121,13 +140,25 @@ class SxgjdlOptionsFlow(config_entries.OptionsFlow):
             self.config_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
         )
 
+        schema: dict[Any, Any] = {
+            vol.Optional(
+                CONF_SCAN_INTERVAL, default=current_interval
+            ): vol.All(vol.Coerce(int), vol.Range(min=10, max=1440)),
+        }
+        for conf_key, default in ENDPOINT_TTL_OPTIONS.values():
+            schema[
+                vol.Optional(conf_key, default=self.config_entry.options.get(conf_key, default))
+            ] = TTL_VALIDATOR
+        schema[
+            vol.Optional(
+                CONF_ADAPTIVE_POLLING,
+                default=self.config_entry.options.get(
+                    CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING
+                ),
+            )
+        ] = cv.boolean
+
         return self.async_show_form(
             step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Optional(
-                        CONF_SCAN_INTERVAL, default=current_interval
-                    ): vol.All(vol.Coerce(int), vol.Range(min=10, max=1440)),
-                }
-            ),
+            data_schema=vol.Schema(schema),
         )
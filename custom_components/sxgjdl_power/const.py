@@ -8,10 +8,25 @@ CONF_CONS_NO = "cons_no"
 CONF_ORG_NO = "org_no"
 CONF_OPEN_ID = "open_id"
 CONF_SCAN_INTERVAL = "scan_interval"
+CONF_TTL_RECORD_LIST = "ttl_record_list"
+CONF_TTL_LIST_BY_YEAR = "ttl_list_by_year"
+CONF_TTL_DAYS_OF_MONTH = "ttl_days_of_month"
+CONF_TTL_DAYS_ONLY = "ttl_days_only"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
 
 # 默认刷新间隔（分钟）
 DEFAULT_SCAN_INTERVAL = 60
 
+# 单次刷新内并发请求上限：不小于一轮的接口数（1 月份为 6 个），一轮内全部并发，
+# 刷新耗时接近最慢的单个接口；整体请求速率由全局令牌桶限制
+MAX_CONCURRENT_REQUESTS = 6
+# 单次刷新的总时限（秒，含排队和限流等待），到时仍未完成的接口被取消并沿用上次结果
+REFRESH_DEADLINE = 40
+
+# 配置流程验证时取得的户号信息，交给随后的集成初始化复用（秒内有效）
+DATA_VALIDATED = f"{DOMAIN}_validated"
+VALIDATION_REUSE_WINDOW = 300
+
 # API
 BASE_URL = "http://ddwxyw.sxgjdl.com/wechart-platform-web"
 
@@ -22,6 +37,29 @@ API_LIST_BY_YEAR  = "/getListByYear"             # 年度账单明细
 API_DAYS_OF_MONTH = "/getDaysOfMonthData"        # 月度每日用电（含预估）
 API_DAYS_ONLY     = "/getDaysOnlyData"           # 当日用电（分时）
 
+# 各接口缓存有效期（分钟）；余额接口沿用 scan_interval
+DEFAULT_TTL_RECORD_LIST = 1440    # 月度汇总每天一次
+DEFAULT_TTL_LIST_BY_YEAR = 1440   # 账单明细每天一次
+DEFAULT_TTL_DAYS_OF_MONTH = 240   # 每日用电每天数次
+DEFAULT_TTL_DAYS_ONLY = 240       # 分时用电每天数次
+
+# 自适应轮询：按学习到的每日数据上传时间调整每日用电的请求频率
+DEFAULT_ADAPTIVE_POLLING = True
+
+# 接口 -> (选项键, 默认有效期)
+ENDPOINT_TTL_OPTIONS = {
+    API_RECORD_LIST:   (CONF_TTL_RECORD_LIST, DEFAULT_TTL_RECORD_LIST),
+    API_LIST_BY_YEAR:  (CONF_TTL_LIST_BY_YEAR, DEFAULT_TTL_LIST_BY_YEAR),
+    API_DAYS_OF_MONTH: (CONF_TTL_DAYS_OF_MONTH, DEFAULT_TTL_DAYS_OF_MONTH),
+    API_DAYS_ONLY:     (CONF_TTL_DAYS_ONLY, DEFAULT_TTL_DAYS_ONLY),
+}
+
+# 历史序列（WebSocket 查询与导出服务共用）
+SERIES_DAILY = "daily"      # 每日用电
+SERIES_MONTHLY = "monthly"  # 月度用电/电费
+SERIES_BILLS = "bills"      # 账单及电价明细
+HISTORY_SERIES = (SERIES_DAILY, SERIES_MONTHLY, SERIES_BILLS)
+
 # 传感器唯一 ID 后缀
 SENSOR_BALANCE            = "balance"            # 预付余额
 SENSOR_RECEIVABLE         = "receivable_amt"     # 应收电费（待缴）
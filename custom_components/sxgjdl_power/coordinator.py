@@ -1,234 +1,691 @@
 """山西地电用电查询 - 数据协调器"""
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import math
+import zlib
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
 from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .api import SxgjdlApiClient, SxgjdlApiError
-from .const import DOMAIN
+from .api import RequestBudget, SxgjdlApiClient, SxgjdlApiError, request_budget
+from .adaptive import BurnRateModel, UploadTimeLearner
+from .history import SxgjdlHistoryStore
+from .model import BillSummary, SxgjdlSnapshot
+from .resilience import MAINTENANCE_PROBE_INTERVAL, MaintenanceTracker
+from .statistics import SxgjdlStatisticsImporter
+from .tariff import TariffEngine, parse_prices
+from .const import (
+    DOMAIN,
+    MAX_CONCURRENT_REQUESTS,
+    REFRESH_DEADLINE,
+    API_FEES,
+    API_RECORD_LIST,
+    API_LIST_BY_YEAR,
+    API_DAYS_OF_MONTH,
+    API_DAYS_ONLY,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-MONTH_NAMES = {
-    1: "一月", 2: "二月", 3: "三月", 4: "四月",
-    5: "五月", 6: "六月", 7: "七月", 8: "八月",
-    9: "九月", 10: "十月", 11: "十一月", 12: "十二月",
+SNAPSHOT_STORAGE_VERSION = 1
+# 快照延迟写盘，避免每次刷新都写文件
+SNAPSHOT_SAVE_DELAY = 60
+# 保留最近多少天的分时电量（未结算的日期不进入历史缓存，随快照保存）
+TOU_SPLIT_RETENTION = 62
+
+
+# 定向刷新的数据组 -> 接口缓存名
+REFRESH_GROUPS: dict[str, tuple[str, ...]] = {
+    "balance": ("fees",),
+    "daily": ("days_of_month",),
+    "tou": ("days_only",),
+    "monthly": ("record_list", "last_december"),
+    "bills": ("list_by_year",),
 }
 
 
-class SxgjdlDataCoordinator(DataUpdateCoordinator):
+def snapshot_storage_key(cons_no: str) -> str:
+    """数据快照的存储键，每个户号一个文件"""
+    return f"{DOMAIN}.snapshot.{cons_no}"
+
+
+@dataclass
+class _CachedPart:
+    """单个接口的缓存结果"""
+
+    period: str        # 数据所属周期（年/月/日），周期变化即视为过期
+    fetched_at: float  # client.monotonic()
+    part: dict[str, Any]
+
+
+class SxgjdlDataCoordinator(DataUpdateCoordinator[SxgjdlSnapshot]):
     """统一数据更新协调器，汇总所有接口数据"""
 
     def __init__(
         self,
         hass: HomeAssistant,
         client: SxgjdlApiClient,
+        history: SxgjdlHistoryStore,
         scan_interval: int,
+        endpoint_ttls: dict[str, int] | None = None,
+        adaptive_polling: bool = False,
     ) -> None:
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(minutes=scan_interval),
-        )
+        # 各接口独立的缓存有效期（分钟），余额接口使用 scan_interval
+        ttls = {API_FEES: scan_interval, **(endpoint_ttls or {})}
+        self._ttls = {path: timedelta(minutes=m) for path, m in ttls.items()}
+        # 刷新节拍取最短的有效期，每次只请求已过期的接口
+        self.refresh_interval = min(self._ttls.values())
+        # 不自行计时，由域级批量调度器统一驱动刷新
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=None)
         self.client = client
-        # 缓存上一次成功的数据，维护期间直接返回缓存
-        self._last_valid_data: dict[str, Any] = {}
+        # 历史查询走持久缓存，已结算周期不再请求服务器
+        self.history = history
+        # 历史月度数据导入长期统计
+        self.statistics = SxgjdlStatisticsImporter(hass, history)
+        # 上一次成功的数据，就地更新；维护期间直接返回
+        self._snapshot = SxgjdlSnapshot()
+        # 各接口最近一次成功的解析结果
+        self._endpoint_cache: dict[str, _CachedPart] = {}
+        # 最近一次开始刷新的时间（client.monotonic()，回放录制文件时为模拟时钟）
+        self._last_refresh_at: float | None = None
+        # 刷新相位（0~1，按户号固定）：各户号在刷新间隔内错开到期，不会每轮同时刷新
+        self.phase = zlib.crc32(client.cons_no.encode()) / 2**32
+        # 快照启动后尚未进行首次刷新和户号验证（由调度器统一错开执行）
+        self.startup_pending = False
+        # 学习到的服务器固定维护时段，时段内暂停轮询
+        self.maintenance = MaintenanceTracker()
+        # 自适应轮询：学习每日数据的上传时间，在其前后密集请求每日用电
+        self.adaptive_polling = adaptive_polling
+        self.upload_learner = UploadTimeLearner()
+        # 阶梯/分时计费，按日增量累计
+        self.tariff = TariffEngine()
+        # 每日峰/平/谷电量 {YYYYMMDD: (峰, 平, 谷)}，供分时计费
+        self._tou_splits: dict[str, tuple[float, float, float]] = {}
+        # 余额耗尽预测；自适应模式下据此调整余额轮询频率
+        self.burn_rate = BurnRateModel()
+        # 磁盘快照：重启后立即恢复传感器数值
+        self._snapshot_store: Store[dict[str, Any]] = Store(
+            hass, SNAPSHOT_STORAGE_VERSION, snapshot_storage_key(client.cons_no)
+        )
+
+    async def async_restore_snapshot(self) -> bool:
+        """加载磁盘快照作为初始数据，返回是否成功恢复"""
+        stored = await self._snapshot_store.async_load()
+        if not stored:
+            return False
+        self.maintenance = MaintenanceTracker.from_dict(stored.get("maintenance"))
+        self.upload_learner = UploadTimeLearner.from_dict(stored.get("upload_time"))
+        self.burn_rate = BurnRateModel.from_dict(stored.get("burn_rate"))
+        self._tou_splits = {
+            ymd: (float(split[0]), float(split[1]), float(split[2]))
+            for ymd, split in (stored.get("tou_splits") or {}).items()
+        }
+        if not stored.get("data"):
+            return False
+        self._snapshot = SxgjdlSnapshot.from_dict(stored["data"])
+        self._snapshot.restored_at = stored.get("saved_at", "")
+        self.async_set_updated_data(self._snapshot)
+        self.startup_pending = True
+        _LOGGER.debug(
+            "已从快照恢复 %s 的数据（保存于 %s）", self.client.cons_no, self._snapshot.restored_at
+        )
+        return True
+
+    def seed_cons_info(self, cons_info: dict[str, Any]) -> None:
+        """用配置流程已取得的户号信息预填户名、地址和供电所"""
+        info = cons_info.get("data") or {}
+        self._snapshot.apply({
+            "cons_name": info.get("consName", ""),
+            "elec_addr": info.get("elecAddr", ""),
+            "org_name": info.get("orgName", ""),
+        })
+
+    @callback
+    def _snapshot_to_save(self) -> dict[str, Any]:
+        return {
+            # 带时区，与 last_updated 一致
+            "saved_at": dt_util.now().isoformat(timespec="seconds"),
+            "data": self._snapshot.as_dict(),
+            "maintenance": self.maintenance.as_dict(),
+            "upload_time": self.upload_learner.as_dict(),
+            "burn_rate": self.burn_rate.as_dict(),
+            "tou_splits": {ymd: list(split) for ymd, split in self._tou_splits.items()},
+        }
+
+    async def async_save_snapshot(self) -> None:
+        """立即写入快照（卸载时调用）"""
+        if self._snapshot.has_data:
+            await self._snapshot_store.async_save(self._snapshot_to_save())
+
+    def _is_fresh(self, name: str, path: str, period: str) -> bool:
+        """接口缓存是否仍在有效期内"""
+        cached = self._endpoint_cache.get(name)
+        if cached is None or cached.period != period:
+            return False
+        return self.client.monotonic() - cached.fetched_at < self._ttl(path, cached.fetched_at).total_seconds()
+
+    def _ttl(self, path: str, fetched_at: float) -> timedelta:
+        """接口缓存有效期
+
+        自适应模式下每日用电按学习到的上传时间调整，余额按预计可用天数调整。
+        """
+        ttl = self._ttls.get(path, self.refresh_interval)
+        if self.adaptive_polling and path == API_DAYS_OF_MONTH:
+            fetched_dt = self.client.now() - timedelta(seconds=self.client.monotonic() - fetched_at)
+            ttl = self.upload_learner.ttl(fetched_dt, ttl)
+        elif self.adaptive_polling and path == API_FEES:
+            ttl = self.burn_rate.ttl(self._snapshot.balance_days_left, ttl)
+        return ttl
+
+    @property
+    def refresh_due(self) -> bool:
+        """是否已到下一次刷新时刻（按户号相位错开，供批量调度器判断）"""
+        if self._last_refresh_at is None:
+            return True
+        elapsed = self.client.monotonic() - self._last_refresh_at
+        if self.maintenance.in_window(self.client.now()):
+            # 维护时段内只做稀疏探测
+            return elapsed >= max(
+                self.refresh_interval, MAINTENANCE_PROBE_INTERVAL
+            ).total_seconds()
+        if self.adaptive_polling:
+            # 上传窗口内的每日用电、余额紧张时的余额，有效期可能短于刷新节拍
+            for name, path in (("days_of_month", API_DAYS_OF_MONTH), ("fees", API_FEES)):
+                cached = self._endpoint_cache.get(name)
+                if cached is not None and not self._is_fresh(name, path, cached.period):
+                    return True
+        return self.client.monotonic() >= self._next_due_after(self._last_refresh_at)
+
+    def _next_due_after(self, last: float) -> float:
+        """上次刷新后的下一个相位对齐时刻，与上次至少间隔半个刷新节拍"""
+        interval = self.refresh_interval.total_seconds()
+        offset = self.phase * interval
+        return offset + math.ceil((last + interval / 2 - offset) / interval) * interval
+
+    async def async_scheduled_refresh(self) -> None:
+        """由批量调度器调用；快照启动后的第一次刷新同时验证户号，两者并发进行"""
+        if not self.startup_pending:
+            await self.async_refresh()
+            return
+        self.startup_pending = False
+        valid, _ = await asyncio.gather(
+            self.client.validate_connection(),
+            self.async_refresh(),
+            return_exceptions=True,
+        )
+        if valid is not True:
+            _LOGGER.warning("户号 %s 验证失败，继续显示快照数据", self.client.cons_no)
+
+    async def async_refresh_groups(self, groups: Iterable[str]) -> None:
+        """只重新请求指定数据组（见 REFRESH_GROUPS）并合并进当前快照
 
-    async def _async_update_data(self) -> dict[str, Any]:
-        """拉取所有数据并汇总，失败时返回上次有效数据"""
-        now = datetime.now()
+        忽略缓存有效期，不影响常规刷新节拍；数值未变的传感器不会写入状态。
+        全部失败时抛出 UpdateFailed，当前数据保持不变。
+        """
+        only = frozenset(name for group in groups for name in REFRESH_GROUPS[group])
+        snapshot = await self._async_update_data(only)
+        self.async_set_updated_data(snapshot)
+
+    async def _async_update_data(self, only: frozenset[str] | None = None) -> SxgjdlSnapshot:
+        """并发拉取所有数据并汇总，失败时返回上次有效数据
+
+        only 为定向刷新时要强制请求的接口缓存名，其余接口沿用缓存。
+        """
+        if only is None:
+            self._last_refresh_at = self.client.monotonic()
+        # 整轮刷新共用一个时限，排队、限流等待和补查都计入
+        deadline = RequestBudget(REFRESH_DEADLINE)
+        now = self.client.now()
         current_year = now.year
         current_month = now.strftime("%Y%m")
         today = now.strftime("%Y%m%d")
+        # 分时电量查询最近一个有日用电量的日期（服务器次日才上传），用于当日计费
+        latest = self._snapshot.daily.latest()
+        tou_day = latest[0] if latest else (now - timedelta(days=1)).strftime("%Y%m%d")
+
+        # (缓存名, 接口, 数据周期, 拉取函数)；各接口互不依赖，可并发请求
+        jobs: list[tuple[str, str, str, Callable[[], Awaitable[dict[str, Any] | None]]]] = [
+            ("fees", API_FEES, "", self._fetch_fees),
+            ("record_list", API_RECORD_LIST, current_month,
+             partial(self._fetch_record_list, current_year, now.month)),
+            ("days_of_month", API_DAYS_OF_MONTH, today,
+             partial(self._fetch_days_of_month, current_month, today)),
+            ("days_only", API_DAYS_ONLY, tou_day, partial(self._fetch_days_only, tou_day)),
+            ("list_by_year", API_LIST_BY_YEAR, str(current_year),
+             partial(self._fetch_list_by_year, current_year)),
+        ]
+        # 1月份时上月是去年12月，需要额外查上一年数据
+        if now.month == 1:
+            jobs.append((
+                "last_december", API_RECORD_LIST, str(current_year - 1),
+                partial(self._fetch_last_december, current_year - 1),
+            ))
+
+        if only is not None:
+            # 定向刷新：强制请求指定接口，并丢弃客户端可复用的最近响应
+            due = [job for job in jobs if job[0] in only]
+            self.client.forget_recent(job[1] for job in due)
+        else:
+            # 只请求缓存已过期的接口
+            due = [job for job in jobs if not self._is_fresh(job[0], job[1], job[2])]
+            for job in jobs:
+                if job not in due:
+                    self.client.stats.endpoint(job[1]).cache_hits += 1
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def _run(fetch: Callable[[], Awaitable[dict[str, Any] | None]]) -> dict[str, Any] | None:
+            async with semaphore:
+                return await fetch()
+
+        async def _limited(
+            name: str,
+            path: str,
+            fetch: Callable[[], Awaitable[dict[str, Any] | None]],
+        ) -> tuple[dict[str, Any] | None, bool]:
+            """返回 (解析结果, 是否因超出时限而失败)
+
+            到时限仍未完成的接口被取消（含排队中的），由缓存兜底。
+            """
+            token = request_budget.set(deadline)
+            try:
+                part = await asyncio.wait_for(_run(fetch), deadline.remaining())
+            except asyncio.TimeoutError:
+                deadline.expired = True
+                part = None
+            finally:
+                request_budget.reset(token)
+            expired = part is None and deadline.exhausted()
+            if expired:
+                _LOGGER.warning("%s 超出刷新时限 %d 秒，沿用上次数据", name, REFRESH_DEADLINE)
+                self.client.stats.endpoint(path).deadline_exceeded += 1
+            return part, expired
+
+        results = list(await asyncio.gather(*(_limited(*job[:2], job[3]) for job in due)))
+        for (name, _path, period, _fetch), (part, _expired) in zip(due, results):
+            if part is not None:
+                self._endpoint_cache[name] = _CachedPart(period, self.client.monotonic(), part)
+
+        # 本轮每日用电出现了新的一天：补查该日分时电量，当轮即可按分时计费（计入同一时限）
+        new_day = self._latest_daily_ymd(today)
+        if new_day and new_day > tou_day and (only is None or "days_only" in only):
+            index = next(i for i, job in enumerate(jobs) if job[0] == "days_only")
+            jobs[index] = job = (
+                "days_only", API_DAYS_ONLY, new_day, partial(self._fetch_days_only, new_day)
+            )
+            if not self._is_fresh(*job[:3]):
+                due.append(job)
+                part, expired = await _limited(*job[:2], job[3])
+                results.append((part, expired))
+                if part is not None:
+                    self._endpoint_cache["days_only"] = _CachedPart(
+                        new_day, self.client.monotonic(), part
+                    )
+
+        fetched = [part for part, _expired in results]
+        any_success = any(
+            part is not None for job, part in zip(due, fetched) if job[0] != "last_december"
+        )
+        _LOGGER.debug("本次刷新请求接口: %s", [job[0] for job in due])
+
+        # 维护时段学习：本轮请求全部失败记为一次整体故障，有成功则清除该时段；
+        # 仅因时限失败的接口不代表服务器故障，不计入；定向刷新只涉及部分接口，也不计入故障
+        if any(part is not None for part in fetched):
+            self.maintenance.record_success(now)
+        elif only is None and any(not expired for _part, expired in results):
+            self.maintenance.record_outage(now)
+            if self.maintenance.in_window(now):
+                _LOGGER.info("当前处于已识别的服务器维护时段，暂停轮询: %s 时", now.hour)
+            self._snapshot_store.async_delay_save(self._snapshot_to_save, SNAPSHOT_SAVE_DELAY)
+
+        # 未过期或本次失败的接口沿用同周期的缓存结果；合并顺序固定
+        parts: dict[str, dict[str, Any] | None] = {}
+        for name, _path, period, _fetch in jobs:
+            cached = self._endpoint_cache.get(name)
+            parts[name] = cached.part if cached and cached.period == period else None
 
         result: dict[str, Any] = {}
-        any_success = False
+        for name in ("fees", "record_list", "days_of_month", "days_only", "list_by_year"):
+            if parts[name]:
+                _merge_part(result, parts[name])
+        last_dec_part = parts.get("last_december")
+        if parts["record_list"] is not None and last_dec_part and "last_month_usage" not in result:
+            result.update((k, v) for k, v in last_dec_part.items() if k.startswith("last_month_"))
+
+        snapshot = self._snapshot
+
+        # ------------------------------------------------------------------ #
+        # 缓存逻辑：有新数据则更新缓存；全部失败则用缓存，避免传感器变"未知"  #
+        # ------------------------------------------------------------------ #
+        if any_success and result:
+            # 用新数据更新快照（只覆盖本次成功拿到的字段）
+            snapshot.apply(result)
+            snapshot.generation += 1
+            self._update_costs(snapshot, current_month)
+            self._update_forecast(snapshot)
+            # 记录上次成功更新时间（带时区，与 HA 配置的时区一致）
+            snapshot.last_updated = dt_util.now().isoformat(timespec="seconds")
+            snapshot.using_cache = False
+            snapshot.restored_at = None
+            _LOGGER.debug("数据更新成功，已刷新缓存")
+            self._snapshot_store.async_delay_save(self._snapshot_to_save, SNAPSHOT_SAVE_DELAY)
+            return snapshot
+
+        if only is not None:
+            # 定向刷新失败不标记为使用缓存，常规刷新仍按原节拍进行
+            raise UpdateFailed("定向刷新的接口均请求失败，保留当前数据")
 
-        # 1. 电费信息（余额、应收）
+        if not due and snapshot.has_data:
+            # 所有接口缓存均未过期，本轮无需请求
+            return snapshot
+
+        if snapshot.has_data:
+            # 全部接口失败，返回缓存数据，并打上维护标记
+            _LOGGER.warning("所有接口请求失败，使用缓存数据（可能为服务器维护中）")
+            if not snapshot.using_cache:
+                snapshot.using_cache = True
+                snapshot.restored_at = None
+                snapshot.generation += 1
+            return snapshot
+
+        # 首次启动就全部失败，才真正抛出异常
+        raise UpdateFailed("所有接口均无法获取数据，请检查户号或网络连接")
+
+    def _latest_daily_ymd(self, today: str) -> str | None:
+        """本轮缓存的每日用电中最新的日期"""
+        cached = self._endpoint_cache.get("days_of_month")
+        if cached is None or cached.period != today or not cached.part.get("daily"):
+            return None
+        return max(ymd for ymd, _pq in cached.part["daily"])
+
+    def _tou_split(self, ymd: str, history_days: dict[str, Any]) -> tuple[float, float, float] | None:
+        """某天的 (峰, 平, 谷) 电量：近期取自分时查询，已结算的取自历史缓存"""
+        split = self._tou_splits.get(ymd)
+        if split is None:
+            day = (history_days.get(ymd) or {}).get("data")
+            if day:
+                split = (
+                    float(day.get("peakPq") or 0), float(day.get("flatPq") or 0),
+                    float(day.get("valleyPq") or 0),
+                )
+        # 全为 0 说明分时数据尚未生成，按无分时处理
+        return split if split and sum(split) > 0 else None
+
+    def _usage_before(self, snapshot: SxgjdlSnapshot, year: int, month: int) -> float:
+        """year 年 month 月之前的累计用电量（阶梯按自然年累计）
+
+        年初最近一天仍在上一年时，取 1 月份额外查询的上年数据或历史缓存。
+        """
+        if snapshot.record_year == year:
+            return sum(usage for m, usage, _amt in snapshot.monthly() if m < month)
+        cached = self._endpoint_cache.get("last_december")
+        if cached is not None and cached.period == str(year):
+            months = cached.part.get("prior_year_usage", ())
+        else:
+            payload = self.history.cached_payloads(API_RECORD_LIST).get(str(year)) or {}
+            months = [
+                (rec.get("month", 0), rec.get("thisPq", 0))
+                for rec in (payload.get("data") or {}).get("recordList", [])
+            ]
+        return sum(usage for m, usage in months if 1 <= m < month)
+
+    def _update_costs(self, snapshot: SxgjdlSnapshot, current_month: str) -> None:
+        """昨日/本月电费无法直接获取，按账单中的阶梯/分时电价增量计算
+
+        只有新日期（或最近一天被修正）才计费；换月、电价或年初用电量变化时
+        才重新累计当月。
+        """
+        engine = self.tariff
+        latest = snapshot.daily.latest()
+        if latest is not None:
+            year_month = latest[0][:6]
+            year, month = int(year_month[:4]), int(year_month[4:])
+            year_before = self._usage_before(snapshot, year, month)
+            tiers, tou = snapshot.cached(
+                "tariff_prices", lambda s: parse_prices(s.bills, s.unit_price)
+            )
+            key = (year_month, year_before, tiers, tou)
+            history_days = self.history.cached_payloads(API_DAYS_ONLY) if tou else {}
+            if engine.key != key or any(
+                self._tou_split(ymd, history_days) for ymd in engine.unsplit_days
+                if ymd != engine.last_ymd
+            ):
+                # 换月/电价变化，或更早日期的分时电量后到：重新累计当月
+                engine.reset(key, year_month, year_before, tiers, tou)
+            for ymd, kwh in snapshot.daily.since(engine.last_ymd or f"{year_month}01"):
+                split = self._tou_split(ymd, history_days) if tou else None
+                engine.add_day(ymd, kwh, split)
+
+        in_month = engine.ready and engine.year_month == current_month
+        # 无数据时兜底为 0，避免传感器显示"未知"
+        snapshot.apply({
+            "today_amt": round(engine.last_cost, 4) if engine.ready else 0,
+            "month_esti_amt": round(engine.month_cost, 4) if in_month else 0,
+            "month_projected_amt": round(engine.projected_cost(), 2) if in_month else 0,
+            "tariff_tier": engine.tier_name if engine.ready else None,
+            "year_usage_to_date": round(engine.year_usage, 2) if engine.ready else None,
+        })
+        if engine.ready:
+            _LOGGER.debug(
+                "昨日电费 %.4f 元，本月累计 %.4f 元（%s，年累计 %.2f kWh）",
+                engine.last_cost, engine.month_cost, engine.tier_name, engine.year_usage,
+            )
+
+    def _update_forecast(self, snapshot: SxgjdlSnapshot) -> None:
+        """按日均用电和当前电价预测余额耗尽时间（只计入新日期）"""
+        model = self.burn_rate
+        for ymd, kwh in snapshot.daily.since(model.last_ymd or "0"):
+            model.observe(ymd, kwh)
+        price = self.tariff.marginal_price or snapshot.unit_price or 0
+        forecast = None
+        if snapshot.prepay_bal is not None:
+            forecast = model.forecast(float(snapshot.prepay_bal), price, dt_util.now())
+        if forecast is None:
+            snapshot.apply({"balance_days_left": None, "balance_depletion_at": None})
+            return
+        days_left, depletion_at = forecast
+        snapshot.apply({
+            "balance_days_left": round(days_left, 1),
+            "balance_depletion_at": depletion_at.isoformat(timespec="seconds"),
+        })
+
+    # ------------------------------------------------------------------ #
+    #  各接口拉取：成功返回解析后的字段，失败返回 None                      #
+    # ------------------------------------------------------------------ #
+
+    async def _fetch_fees(self) -> dict[str, Any] | None:
+        """1. 电费信息（余额、应收）"""
         try:
             fees = await self.client.get_fees()
-            if fees.get("flag"):
-                fee_data = fees.get("data", {})
-                result["prepay_bal"] = fee_data.get("prepayBal", 0.0)
-                result["rcv_amt_total"] = fee_data.get("rcvAmtTotal", 0.0)
-                result["amt_total"] = fee_data.get("amtTotal", 0.0)
-                result["org_name"] = fee_data.get("orgName", "")
-                result["cons_name"] = fee_data.get("consName", "")
-                result["elec_addr"] = fee_data.get("elecAddr", "")
-                any_success = True
         except SxgjdlApiError as err:
             _LOGGER.warning("获取电费信息失败: %s", err)
+            return None
+        if not fees.get("flag"):
+            return None
+        fee_data = fees.get("data", {})
+        return {
+            "prepay_bal": fee_data.get("prepayBal", 0.0),
+            "rcv_amt_total": fee_data.get("rcvAmtTotal", 0.0),
+            "amt_total": fee_data.get("amtTotal", 0.0),
+            "org_name": fee_data.get("orgName", ""),
+            "cons_name": fee_data.get("consName", ""),
+            "elec_addr": fee_data.get("elecAddr", ""),
+        }
 
-        # 2. 年度月度汇总（本年）
+    async def _fetch_record_list(self, year: int, month: int) -> dict[str, Any] | None:
+        """2. 年度月度汇总（本年）"""
         try:
-            record = await self.client.get_record_list(current_year)
-            if record.get("flag"):
-                rec_data = record.get("data", {})
-                record_list = rec_data.get("recordList", [])
-                cons_detail = rec_data.get("consDetail", {})
-
-                result["year_total_usage"] = cons_detail.get("maxPq", 0)
-                result["year_total_amt"] = cons_detail.get("amtTotal", 0.0)
-                result["cons_name"] = result.get("cons_name") or cons_detail.get("consName", "")
-                result["elec_addr"] = result.get("elec_addr") or cons_detail.get("elecAddr", "")
-
-                cur_month_num = now.month
-                last_month_num = cur_month_num - 1 if cur_month_num > 1 else 12
-
-                for rec in record_list:
-                    m = rec.get("month", 0)
-                    if m == cur_month_num:
-                        result["month_usage"] = rec.get("thisPq", 0)
-                        result["month_amt"] = rec.get("prices", 0.0)
-                    elif m == last_month_num:
-                        result["last_month_usage"] = rec.get("thisPq", 0)
-                        result["last_month_amt"] = rec.get("prices", 0.0)
-
-                # 1月份时上月是去年12月，需要额外查上一年数据
-                if cur_month_num == 1 and "last_month_usage" not in result:
-                    try:
-                        last_year_rec = await self.client.get_record_list(current_year - 1)
-                        if last_year_rec.get("flag"):
-                            for rec in last_year_rec.get("data", {}).get("recordList", []):
-                                if rec.get("month") == 12:
-                                    result["last_month_usage"] = rec.get("thisPq", 0)
-                                    result["last_month_amt"] = rec.get("prices", 0.0)
-                                    break
-                    except SxgjdlApiError as err:
-                        _LOGGER.warning("获取上年12月数据失败: %s", err)
-
-                for rec in record_list:
-                    m = rec.get("month", 0)
-                    if 1 <= m <= 12:
-                        result[f"monthly_usage_{m:02d}"] = rec.get("thisPq", 0)
-                        result[f"monthly_amt_{m:02d}"] = rec.get("prices", 0.0)
-
-                monthly_summary = {
-                    "year": current_year,
-                    "months": [
-                        {
-                            "month": rec.get("month"),
-                            "name": MONTH_NAMES.get(rec.get("month", 0), ""),
-                            "usage_kwh": rec.get("thisPq", 0),
-                            "amount_yuan": rec.get("prices", 0.0),
-                        }
-                        for rec in record_list
-                        if rec.get("month", 0) > 0
-                    ],
-                }
-                result["monthly_summary"] = monthly_summary
-                result["record_list"] = record_list
-                any_success = True
+            record = await self.history.get_record_list(year)
         except SxgjdlApiError as err:
             _LOGGER.warning("获取年度用电记录失败: %s", err)
+            return None
+        if not record.get("flag"):
+            return None
+
+        rec_data = record.get("data", {})
+        record_list = rec_data.get("recordList", [])
+        cons_detail = rec_data.get("consDetail", {})
+
+        result: dict[str, Any] = {
+            "year_total_usage": cons_detail.get("maxPq", 0),
+            "year_total_amt": cons_detail.get("amtTotal", 0.0),
+            "cons_name": cons_detail.get("consName", ""),
+            "elec_addr": cons_detail.get("elecAddr", ""),
+        }
+
+        last_month_num = month - 1 if month > 1 else 12
+        monthly: list[tuple[int, float, float]] = []
+        for rec in record_list:
+            m = rec.get("month", 0)
+            if not 1 <= m <= 12:
+                continue
+            usage, amt = rec.get("thisPq", 0), rec.get("prices", 0.0)
+            monthly.append((m, usage, amt))
+            if m == month:
+                result["month_usage"] = usage
+                result["month_amt"] = amt
+            elif m == last_month_num:
+                result["last_month_usage"] = usage
+                result["last_month_amt"] = amt
+
+        result["record_year"] = year
+        result["monthly"] = monthly
+        return result
 
-        # 3. 月度每日用电（本月）
+    async def _fetch_last_december(self, year: int) -> dict[str, Any] | None:
+        """2b. 上年12月数据及上年各月用电量（仅1月份需要）"""
         try:
-            days_data = await self.client.get_days_of_month(current_month)
-            if days_data.get("flag"):
-                daily_list = days_data.get("data", [])
-                result["daily_list"] = daily_list
-
-                # 昨日数据（服务器通常次日才上传今天的数据）
-                today_entry = None
-                latest_entry = None
-                for entry in daily_list:
-                    if entry.get("ymd") == today:
-                        today_entry = entry
-                    # 取 ymd 最大的有效条目，不依赖列表顺序
-                    if entry.get("dayEstiPq") is not None:
-                        if latest_entry is None or entry.get("ymd", "") > latest_entry.get("ymd", ""):
-                            latest_entry = entry
-
-                active = today_entry or latest_entry
-                if active:
-                    # key 保持 today_* 不变（避免破坏兼容性），但传感器名称改为"昨日"
-                    result["today_usage"] = active.get("dayEstiPq") or 0
-                    # today_amt / month_esti_amt 均无法直接获取，在步骤5拿到 unit_price 后用乘法计算
-                    result["last_mr_date"] = active.get("lastMrDate", "")
-
-                # 本月预估用电量 = 累加当月每日 dayEstiPq（独立于 active，过滤跨月数据）
-                month_total_usage = 0
-                for day_entry in daily_list:
-                    ymd = day_entry.get("ymd", "")
-                    if ymd and len(ymd) >= 6 and ymd[:6] == current_month:
-                        day_pq = day_entry.get("dayEstiPq")
-                        if day_pq is not None and day_pq > 0:
-                            month_total_usage += day_pq
-                result["month_esti_usage"] = month_total_usage
-                any_success = True
+            last_year_rec = await self.history.get_record_list(year)
+        except SxgjdlApiError as err:
+            _LOGGER.warning("获取上年12月数据失败: %s", err)
+            return None
+        if not last_year_rec.get("flag"):
+            return None
+        records = last_year_rec.get("data", {}).get("recordList", [])
+        # 上年各月用电量：年初最近一天仍在上一年时，阶梯累计从这里取
+        result: dict[str, Any] = {
+            "prior_year_usage": [(rec.get("month", 0), rec.get("thisPq", 0)) for rec in records],
+        }
+        for rec in records:
+            if rec.get("month") == 12:
+                result["last_month_usage"] = rec.get("thisPq", 0)
+                result["last_month_amt"] = rec.get("prices", 0.0)
+        return result
+
+    async def _fetch_days_of_month(self, year_month: str, today: str) -> dict[str, Any] | None:
+        """3. 月度每日用电（本月）"""
+        try:
+            days_data = await self.history.get_days_of_month(year_month)
         except SxgjdlApiError as err:
             _LOGGER.warning("获取月度每日用电失败: %s", err)
+            return None
+        if not days_data.get("flag"):
+            return None
+
+        daily_list = days_data.get("data", [])
+
+        # 单次遍历：每日序列、今日/最新条目、本月累计
+        daily: list[tuple[str, float]] = []
+        today_entry = None
+        latest_entry = None
+        month_total_usage = 0
+        for entry in daily_list:
+            ymd = entry.get("ymd", "")
+            day_pq = entry.get("dayEstiPq")
+            if ymd == today:
+                today_entry = entry
+            if day_pq is None:
+                continue
+            if ymd:
+                daily.append((ymd, day_pq))
+            # 取 ymd 最大的有效条目，不依赖列表顺序
+            if latest_entry is None or ymd > latest_entry.get("ymd", ""):
+                latest_entry = entry
+            # 本月预估用电量 = 累加当月每日 dayEstiPq（过滤跨月数据）
+            if ymd[:6] == year_month and day_pq > 0:
+                month_total_usage += day_pq
+
+        result: dict[str, Any] = {"daily": daily, "month_esti_usage": month_total_usage}
 
-        # 4. 今日分时数据
+        if latest_entry is not None:
+            self.upload_learner.observe(
+                self.client.now(), latest_entry.get("lastMrDate", ""), latest_entry.get("ymd", "")
+            )
+
+        # 昨日数据（服务器通常次日才上传今天的数据）
+        active = today_entry or latest_entry
+        if active:
+            # key 保持 today_* 不变（避免破坏兼容性），但传感器名称改为"昨日"
+            result["today_usage"] = active.get("dayEstiPq") or 0
+            # today_amt / month_esti_amt 均无法直接获取，汇总后按阶梯电价计算
+            result["last_mr_date"] = active.get("lastMrDate", "")
+        return result
+
+    async def _fetch_days_only(self, date: str) -> dict[str, Any] | None:
+        """4. 最近一天的分时数据（键名沿用 today_* 以保持兼容）"""
         try:
-            day_only = await self.client.get_days_only_data(today)
-            if day_only.get("flag"):
-                d = day_only.get("data", {})
-                result["today_total_pq"] = d.get("totalPq")
-                result["today_peak_pq"] = d.get("peakPq")
-                result["today_flat_pq"] = d.get("flatPq")
-                result["today_valley_pq"] = d.get("valleyPq")
-                result["today_day_total_pq"] = d.get("dayTotalPq")
-                any_success = True
+            day_only = await self.history.get_days_only_data(date)
         except SxgjdlApiError as err:
-            _LOGGER.warning("获取今日分时用电失败: %s", err)
+            _LOGGER.warning("获取 %s 分时用电失败: %s", date, err)
+            return None
+        if not day_only.get("flag"):
+            return None
+        d = day_only.get("data") or {}
+        if d:
+            self._tou_splits[date] = (
+                float(d.get("peakPq") or 0), float(d.get("flatPq") or 0),
+                float(d.get("valleyPq") or 0),
+            )
+            for stale in sorted(self._tou_splits)[:-TOU_SPLIT_RETENTION]:
+                del self._tou_splits[stale]
+        return {
+            "today_total_pq": d.get("totalPq"),
+            "today_peak_pq": d.get("peakPq"),
+            "today_flat_pq": d.get("flatPq"),
+            "today_valley_pq": d.get("valleyPq"),
+            "today_day_total_pq": d.get("dayTotalPq"),
+        }
 
-        # 5. 当年账单明细
+    async def _fetch_list_by_year(self, year: int) -> dict[str, Any] | None:
+        """5. 当年账单明细"""
         try:
-            bill = await self.client.get_list_by_year(current_year)
-            bill_data = bill.get("data") or []
-            if bill_data:
-                latest_bill = bill_data[0]
-                pay_details = latest_bill.get("payDetailList", [])
-                if pay_details:
-                    result["unit_price"] = float(pay_details[0].get("kwhPrc", 0))
-                    result["price_name"] = pay_details[0].get("prcName", "")
-                result["latest_bill_ym"] = latest_bill.get("rcvblYm", "")
-                result["latest_bill_amt"] = latest_bill.get("rcvblAmt", 0.0)
-                result["latest_bill_pq"] = latest_bill.get("tPq", 0)
-                result["bill_list"] = bill_data
-                any_success = True
+            bill = await self.history.get_list_by_year(year)
         except SxgjdlApiError as err:
             _LOGGER.warning("获取账单明细失败: %s", err)
+            return None
+        bill_data = bill.get("data") or []
+        if not bill_data:
+            return None
 
-        # 昨日电费 & 本月预估电费 均无法直接获取，用 用电量 × 当前电价 计算
-        unit_price = result.get("unit_price") or self._last_valid_data.get("unit_price", 0)
-        if unit_price:
-            if result.get("today_usage", 0) > 0:
-                result["today_amt"] = round(result["today_usage"] * unit_price, 4)
-                _LOGGER.debug(
-                    "昨日电费: %.4f kWh × %.4f 元/kWh = %.4f 元",
-                    result["today_usage"], unit_price, result["today_amt"],
-                )
-            if result.get("month_esti_usage", 0) > 0:
-                result["month_esti_amt"] = round(result["month_esti_usage"] * unit_price, 4)
-        # 无数据时兜底为 0，避免传感器显示"未知"
-        result.setdefault("today_amt", 0)
-        result.setdefault("month_esti_amt", 0)
+        latest_bill = bill_data[0]
+        result: dict[str, Any] = {}
+        pay_details = latest_bill.get("payDetailList", [])
+        if pay_details:
+            result["unit_price"] = float(pay_details[0].get("kwhPrc", 0))
+            result["price_name"] = pay_details[0].get("prcName", "")
+        result["latest_bill_ym"] = latest_bill.get("rcvblYm", "")
+        result["latest_bill_amt"] = latest_bill.get("rcvblAmt", 0.0)
+        result["latest_bill_pq"] = latest_bill.get("tPq", 0)
+        result["bills"] = [BillSummary.from_payload(b) for b in bill_data]
+        return result
 
-        # ------------------------------------------------------------------ #
-        # 缓存逻辑：有新数据则更新缓存；全部失败则用缓存，避免传感器变"未知"  #
-        # ------------------------------------------------------------------ #
-        if any_success and result:
-            # 用新数据更新缓存（只覆盖本次成功拿到的 key）
-            self._last_valid_data.update(result)
-            # 记录上次成功更新时间
-            self._last_valid_data["_last_updated"] = now.strftime("%Y-%m-%d %H:%M:%S")
-            _LOGGER.debug("数据更新成功，已刷新缓存")
-            return dict(self._last_valid_data)
 
-        if self._last_valid_data:
-            # 全部接口失败，返回缓存数据，并打上维护标记
-            _LOGGER.warning("所有接口请求失败，使用缓存数据（可能为服务器维护中）")
-            cached = dict(self._last_valid_data)
-            cached["_using_cache"] = True
-            return cached
+# 多个接口都会返回的字段：先到者优先，后续接口仅在缺失时补全
+_FALLBACK_KEYS = ("cons_name", "elec_addr")
 
-        # 首次启动就全部失败，才真正抛出异常
-        raise UpdateFailed("所有接口均无法获取数据，请检查户号或网络连接")
+
+def _merge_part(result: dict[str, Any], part: dict[str, Any]) -> None:
+    """按固定顺序合并单个接口的结果"""
+    for key, value in part.items():
+        if key in _FALLBACK_KEYS:
+            result[key] = result.get(key) or value
+        else:
+            result[key] = value
@@ -0,0 +1,51 @@
+"""山西地电用电查询 - 诊断信息下载"""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_CONS_NO, CONF_OPEN_ID
+from .coordinator import SxgjdlDataCoordinator
+
+# 户号、openId 及户名地址等个人信息不出现在诊断文件中
+TO_REDACT = {
+    CONF_CONS_NO,
+    CONF_OPEN_ID,
+    "consNo",
+    "openId",
+    "cons_name",
+    "consName",
+    "elec_addr",
+    "elecAddr",
+    "title",
+    "unique_id",
+}
+
+# 每日/账单序列只给出条数
+_LIST_KEYS = ("daily", "bills")
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """返回配置条目的诊断信息"""
+    coordinator: SxgjdlDataCoordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data.as_dict() if coordinator.data is not None else {}
+    for key in _LIST_KEYS:
+        if key in data:
+            data[key] = f"{len(data[key])} 条"
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "data": async_redact_data(data, TO_REDACT),
+        "api_stats": coordinator.client.stats.as_dict(),
+        "circuit_breakers": coordinator.client.breaker_states(),
+        "maintenance_windows": coordinator.maintenance.windows,
+        "upload_expected_minute": coordinator.upload_learner.expected_minute,
+        "burn_rate_kwh_per_day": coordinator.burn_rate.kwh_per_day,
+        "adaptive_polling": coordinator.adaptive_polling,
+        "refresh_interval_minutes": coordinator.refresh_interval.total_seconds() / 60,
+    }
@@ -0,0 +1,277 @@
+"""山西地电用电查询 - 历史数据导出（CSV / JSON Lines）
+
+按户号把日期区间内的数据流式写入配置目录 sxgjdl_power/ 下的文件：
+按周期（月/年）生成查询，有限并发地预取并按时间顺序产出，
+每个周期解析后立即交给执行器写盘。已缓存的周期直接读取，新查询的周期
+不加入历史缓存，内存中只保留预取窗口内的数据，导出多年每日数据也不会
+占用大量内存或阻塞事件循环。
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import logging
+import os
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from contextlib import aclosing
+from functools import partial
+from datetime import date
+from pathlib import Path
+from typing import IO, Any, TypeVar
+
+from homeassistant.core import HomeAssistant
+
+from .api import SxgjdlApiError
+from .const import DOMAIN, SERIES_DAILY, SERIES_MONTHLY, SERIES_BILLS
+from .history import SxgjdlHistoryStore
+from .model import BillSummary
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# 导出目录（相对配置目录）
+EXPORT_DIR = DOMAIN
+# 同时进行中的查询数
+EXPORT_CONCURRENCY = 4
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+EXPORT_FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+# 各序列的列（CSV 表头，JSON Lines 的键）
+EXPORT_COLUMNS: dict[str, tuple[str, ...]] = {
+    SERIES_DAILY: ("date", "usage_kwh", "peak_kwh", "flat_kwh", "valley_kwh"),
+    SERIES_MONTHLY: ("month", "usage_kwh", "amount_yuan"),
+    # 账单按电价明细展开，一期账单可能有多行
+    SERIES_BILLS: (
+        "month", "amount_yuan", "usage_kwh", "price_name", "unit_price", "price_usage_kwh",
+    ),
+}
+
+
+def export_path(
+    hass: HomeAssistant, cons_no: str, series: str, start: date, end: date, fmt: str
+) -> Path:
+    """导出文件路径，例如 <config>/sxgjdl_power/0209605903_daily_20250101_20251231.csv"""
+    return Path(hass.config.path(
+        EXPORT_DIR, f"{cons_no}_{series}_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}"
+    ))
+
+
+async def async_export_history(
+    hass: HomeAssistant,
+    history: SxgjdlHistoryStore,
+    series: str,
+    start: date,
+    end: date,
+    fmt: str,
+    include_tou: bool = False,
+) -> tuple[Path, int]:
+    """导出日期区间内的历史序列，返回 (文件路径, 行数)
+
+    先写入临时文件，完成后再替换目标文件；中途失败或取消时删除临时文件。
+    """
+    path = export_path(hass, history.client.cons_no, series, start, end, fmt)
+    writer = _ExportWriter(path, fmt, EXPORT_COLUMNS[series])
+    if series == SERIES_DAILY:
+        chunks = _daily_rows(history, start, end, include_tou)
+    elif series == SERIES_MONTHLY:
+        chunks = _monthly_rows(history, start, end)
+    else:
+        chunks = _bill_rows(history, start, end)
+
+    await hass.async_add_executor_job(writer.open)
+    count = 0
+    try:
+        async with aclosing(chunks):
+            async for rows in chunks:
+                if rows:
+                    await hass.async_add_executor_job(writer.write_rows, rows)
+                    count += len(rows)
+    except BaseException:
+        await hass.async_add_executor_job(writer.close, False)
+        raise
+    await hass.async_add_executor_job(writer.close, True)
+    _LOGGER.info("户号 %s 已导出 %d 行%s数据到 %s", history.client.cons_no, count, series, path)
+    return path, count
+
+
+# ---------------------------------------------------------------------- #
+#  有限并发的顺序预取                                                      #
+# ---------------------------------------------------------------------- #
+
+async def _prefetch(
+    items: Iterable[_T],
+    fetch: Callable[[_T], Awaitable[_R]],
+    limit: int = EXPORT_CONCURRENCY,
+) -> AsyncIterator[tuple[_T, _R]]:
+    """按输入顺序产出 (item, fetch(item))，最多 limit 个查询同时进行"""
+    pending: deque[tuple[_T, asyncio.Task[_R]]] = deque()
+    try:
+        for item in items:
+            pending.append((item, asyncio.create_task(fetch(item))))
+            if len(pending) >= limit:
+                head, task = pending.popleft()
+                yield head, await task
+        while pending:
+            head, task = pending.popleft()
+            yield head, await task
+    finally:
+        # 消费方提前退出或出错时取消剩余预取
+        for _item, task in pending:
+            task.cancel()
+
+
+def _guarded(
+    label: str, fetch: Callable[[_T], Awaitable[dict]]
+) -> Callable[[_T], Awaitable[dict | None]]:
+    """查询失败时记录警告并返回 None，跳过该周期而不中断导出"""
+
+    async def _fetch(period: _T) -> dict | None:
+        try:
+            payload = await fetch(period)
+        except SxgjdlApiError as err:
+            _LOGGER.warning("导出时获取%s %s 失败，已跳过: %s", label, period, err)
+            return None
+        return payload if payload.get("flag") else None
+
+    return _fetch
+
+
+def _months(start: date, end: date) -> Iterator[str]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f"{year}{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+# ---------------------------------------------------------------------- #
+#  各序列的行生成器：每个周期产出一批行                                    #
+# ---------------------------------------------------------------------- #
+
+async def _daily_rows(
+    history: SxgjdlHistoryStore, start: date, end: date, include_tou: bool
+) -> AsyncIterator[list[dict[str, Any]]]:
+    first, last = f"{start:%Y%m%d}", f"{end:%Y%m%d}"
+    fetch_day = _guarded("分时用电", partial(history.get_days_only_data, store=False))
+    months = _prefetch(
+        _months(start, end), _guarded("每日用电", partial(history.get_days_of_month, store=False))
+    )
+    async with aclosing(months):
+        async for _ym, payload in months:
+            days: dict[str, float] = {}
+            for entry in (payload or {}).get("data") or []:
+                ymd = entry.get("ymd", "")
+                if entry.get("dayEstiPq") is not None and first <= ymd <= last:
+                    days[ymd] = entry["dayEstiPq"]
+            rows = [{"date": ymd, "usage_kwh": days[ymd]} for ymd in sorted(days)]
+            if include_tou:
+                details = _prefetch(rows, lambda row: fetch_day(row["date"]))
+                async with aclosing(details):
+                    async for row, day in details:
+                        detail = (day or {}).get("data") or {}
+                        row["peak_kwh"] = detail.get("peakPq")
+                        row["flat_kwh"] = detail.get("flatPq")
+                        row["valley_kwh"] = detail.get("valleyPq")
+            yield rows
+
+
+async def _monthly_rows(
+    history: SxgjdlHistoryStore, start: date, end: date
+) -> AsyncIterator[list[dict[str, Any]]]:
+    first, last = f"{start:%Y%m}", f"{end:%Y%m}"
+    years = _prefetch(
+        range(start.year, end.year + 1),
+        _guarded("月度用电记录", partial(history.get_record_list, store=False)),
+    )
+    async with aclosing(years):
+        async for year, payload in years:
+            records = ((payload or {}).get("data") or {}).get("recordList", [])
+            rows = []
+            for rec in sorted(records, key=lambda r: r.get("month", 0)):
+                ym = f"{year}{rec.get('month', 0):02d}"
+                if 1 <= rec.get("month", 0) <= 12 and first <= ym <= last:
+                    rows.append({
+                        "month": ym,
+                        "usage_kwh": rec.get("thisPq", 0),
+                        "amount_yuan": rec.get("prices", 0.0),
+                    })
+            yield rows
+
+
+async def _bill_rows(
+    history: SxgjdlHistoryStore, start: date, end: date
+) -> AsyncIterator[list[dict[str, Any]]]:
+    first, last = f"{start:%Y%m}", f"{end:%Y%m}"
+
+    async def _fetch(year: int) -> dict | None:
+        # 账单接口响应没有 flag，按 data 判断
+        try:
+            return await history.get_list_by_year(year, store=False)
+        except SxgjdlApiError as err:
+            _LOGGER.warning("导出时获取账单 %s 失败，已跳过: %s", year, err)
+            return None
+
+    years = _prefetch(range(start.year, end.year + 1), _fetch)
+    async with aclosing(years):
+        async for _year, payload in years:
+            bills = [BillSummary.from_payload(b) for b in (payload or {}).get("data") or []]
+            rows = []
+            for bill in sorted(bills, key=lambda b: b.ym):
+                if not first <= bill.ym <= last:
+                    continue
+                base = {"month": bill.ym, "amount_yuan": bill.amt, "usage_kwh": bill.pq}
+                rows.extend(
+                    {**base, "price_name": name, "unit_price": price, "price_usage_kwh": pq}
+                    for name, price, pq in bill.prices
+                )
+                if not bill.prices:
+                    rows.append(base)
+            yield rows
+
+
+# ---------------------------------------------------------------------- #
+#  写文件（所有方法在执行器中调用）                                        #
+# ---------------------------------------------------------------------- #
+
+class _ExportWriter:
+    def __init__(self, path: Path, fmt: str, columns: tuple[str, ...]) -> None:
+        self._path = path
+        self._tmp = path.with_name(path.name + ".part")
+        self._fmt = fmt
+        self._columns = columns
+        self._file: IO[str] | None = None
+        self._csv: csv.DictWriter | None = None
+
+    def open(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if self._fmt == FORMAT_CSV:
+            # 带 BOM，Excel 直接打开中文不乱码
+            self._file = open(self._tmp, "w", encoding="utf-8-sig", newline="")
+            self._csv = csv.DictWriter(self._file, self._columns, extrasaction="ignore")
+            self._csv.writeheader()
+        else:
+            self._file = open(self._tmp, "w", encoding="utf-8")
+
+    def write_rows(self, rows: list[dict[str, Any]]) -> None:
+        assert self._file is not None
+        if self._csv is not None:
+            self._csv.writerows(rows)
+        else:
+            self._file.writelines(
+                json.dumps({c: row.get(c) for c in self._columns}, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+    def close(self, commit: bool) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if commit:
+            os.replace(self._tmp, self._path)
+        else:
+            self._tmp.unlink(missing_ok=True)
@@ -0,0 +1,139 @@
+"""山西地电用电查询 - 历史数据持久缓存"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import SxgjdlApiClient
+from .const import (
+    DOMAIN,
+    API_RECORD_LIST,
+    API_LIST_BY_YEAR,
+    API_DAYS_OF_MONTH,
+    API_DAYS_ONLY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# 延迟写盘，合并短时间内的多次更新
+HISTORY_SAVE_DELAY = 30
+
+# 周期结束后多久视为已结算（账单/抄表数据可能延后上传或修正）
+YEAR_SETTLE_DAYS = 15
+MONTH_SETTLE_DAYS = 5
+DAY_SETTLE_DAYS = 3
+
+
+def history_storage_key(cons_no: str) -> str:
+    """历史缓存的存储键，每个户号一个文件"""
+    return f"{DOMAIN}.history.{cons_no}"
+
+
+def last_settled_day(today: date) -> date:
+    """分时数据已结算（可进入历史缓存）的最后一天"""
+    return today - timedelta(days=DAY_SETTLE_DAYS + 1)
+
+
+def is_settled(endpoint: str, period: str, today: date) -> bool:
+    """判断周期是否已结算（之后数据不再变化）"""
+    if endpoint in (API_RECORD_LIST, API_LIST_BY_YEAR):
+        period_end = date(int(period) + 1, 1, 1)
+        return today >= period_end + timedelta(days=YEAR_SETTLE_DAYS)
+    if endpoint == API_DAYS_OF_MONTH:
+        year, month = int(period[:4]), int(period[4:6])
+        period_end = date(year + month // 12, month % 12 + 1, 1)
+        return today >= period_end + timedelta(days=MONTH_SETTLE_DAYS)
+    if endpoint == API_DAYS_ONLY:
+        period_end = datetime.strptime(period, "%Y%m%d").date() + timedelta(days=1)
+        return today >= period_end + timedelta(days=DAY_SETTLE_DAYS)
+    return False
+
+
+def _is_cacheable(payload: dict) -> bool:
+    """只缓存有效响应；账单接口不一定返回 flag"""
+    return payload.get("flag") is True or bool(payload.get("data"))
+
+
+class SxgjdlHistoryStore:
+    """按 (户号, 接口, 周期) 持久缓存已结算的历史数据
+
+    已结算的周期从本地返回、不再请求服务器；未结算（当前）周期照常请求。
+    """
+
+    def __init__(self, hass: HomeAssistant, client: SxgjdlApiClient) -> None:
+        self.client = client
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, history_storage_key(client.cons_no)
+        )
+        # {接口: {周期: 原始响应}}
+        self._data: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """从磁盘加载历史缓存"""
+        self._data = await self._store.async_load() or {}
+
+    async def async_flush(self) -> None:
+        """立即写盘（卸载时调用）"""
+        await self._store.async_save(self._data)
+
+    def is_cached(self, endpoint: str, period: str) -> bool:
+        """周期是否已在本地缓存"""
+        return period in self._data.get(endpoint, {})
+
+    def cached_payloads(self, endpoint: str) -> dict[str, Any]:
+        """某接口已缓存的全部周期 {周期: 原始响应}"""
+        return self._data.get(endpoint, {})
+
+    async def _async_get(
+        self,
+        endpoint: str,
+        period: str,
+        fetch: Callable[[], Awaitable[dict]],
+        store: bool = True,
+    ) -> dict:
+        """已缓存的周期直接返回；store=False 时新取得的结果不加入缓存（如批量导出）"""
+        cached = self._data.get(endpoint, {}).get(period)
+        if cached is not None:
+            _LOGGER.debug("历史缓存命中 %s %s", endpoint, period)
+            self.client.stats.endpoint(endpoint).cache_hits += 1
+            return cached
+
+        payload = await fetch()
+        if store and is_settled(endpoint, period, self.client.now().date()) and _is_cacheable(payload):
+            self._data.setdefault(endpoint, {})[period] = payload
+            self._store.async_delay_save(lambda: self._data, HISTORY_SAVE_DELAY)
+        return payload
+
+    # ------------------------------------------------------------------ #
+    #  与 SxgjdlApiClient 同名的查询接口                                   #
+    # ------------------------------------------------------------------ #
+
+    async def get_record_list(self, year: int, store: bool = True) -> dict:
+        """年度每月用电量（往年结算后走缓存）"""
+        return await self._async_get(
+            API_RECORD_LIST, str(year), lambda: self.client.get_record_list(year), store
+        )
+
+    async def get_list_by_year(self, year: int, store: bool = True) -> dict:
+        """年度账单明细（往年结算后走缓存）"""
+        return await self._async_get(
+            API_LIST_BY_YEAR, str(year), lambda: self.client.get_list_by_year(year), store
+        )
+
+    async def get_days_of_month(self, year_month: str, store: bool = True) -> dict:
+        """月度每日用电，格式 YYYYMM（往月结算后走缓存）"""
+        return await self._async_get(
+            API_DAYS_OF_MONTH, year_month, lambda: self.client.get_days_of_month(year_month), store
+        )
+
+    async def get_days_only_data(self, day: str, store: bool = True) -> dict:
+        """指定日期分时用电，格式 YYYYMMDD（往日结算后走缓存）"""
+        return await self._async_get(
+            API_DAYS_ONLY, day, lambda: self.client.get_days_only_data(day), store
+        )
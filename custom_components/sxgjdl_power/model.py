@@ -0,0 +1,302 @@
+"""山西地电用电查询 - 协调器数据模型"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TypeVar
+
+_T = TypeVar("_T")
+
+# 保留的历史长度：每日用电最多两个月，账单最多两年
+DAILY_RETENTION = 62
+BILL_RETENTION = 24
+
+MONTH_NAMES = {
+    1: "一月", 2: "二月", 3: "三月", 4: "四月",
+    5: "五月", 6: "六月", 7: "七月", 8: "八月",
+    9: "九月", 10: "十月", 11: "十一月", 12: "十二月",
+}
+
+# 传感器直接读取的标量字段，None 表示尚未获取
+SCALAR_FIELDS = (
+    # 电费信息
+    "prepay_bal",
+    "rcv_amt_total",
+    "amt_total",
+    "org_name",
+    "cons_name",
+    "elec_addr",
+    # 年度月度汇总
+    "year_total_usage",
+    "year_total_amt",
+    "month_usage",
+    "month_amt",
+    "last_month_usage",
+    "last_month_amt",
+    # 每日用电
+    "today_usage",
+    "last_mr_date",
+    "month_esti_usage",
+    # 今日分时
+    "today_total_pq",
+    "today_peak_pq",
+    "today_flat_pq",
+    "today_valley_pq",
+    "today_day_total_pq",
+    # 账单
+    "unit_price",
+    "price_name",
+    "latest_bill_ym",
+    "latest_bill_amt",
+    "latest_bill_pq",
+    # 推算值（阶梯/分时计费）
+    "today_amt",
+    "month_esti_amt",
+    "month_projected_amt",
+    "tariff_tier",
+    "year_usage_to_date",
+    # 余额预测
+    "balance_days_left",
+    "balance_depletion_at",
+)
+
+
+class BillSummary:
+    """单月账单中传感器用到的字段"""
+
+    __slots__ = ("ym", "amt", "pq", "prices")
+
+    def __init__(
+        self, ym: str, amt: float, pq: float, prices: tuple[tuple[str, float, float], ...]
+    ) -> None:
+        self.ym = ym
+        self.amt = amt
+        self.pq = pq
+        # ((电价名称, 单价, 该档电量), ...)
+        self.prices = prices
+
+    @classmethod
+    def from_payload(cls, bill: dict[str, Any]) -> BillSummary:
+        return cls(
+            bill.get("rcvblYm", ""),
+            float(bill.get("rcvblAmt") or 0),
+            float(bill.get("tPq") or 0),
+            tuple(
+                (
+                    detail.get("prcName", ""),
+                    float(detail.get("kwhPrc") or 0),
+                    float(detail.get("pq") or 0),
+                )
+                for detail in bill.get("payDetailList") or []
+            ),
+        )
+
+    def as_list(self) -> list[Any]:
+        return [self.ym, self.amt, self.pq, [list(p) for p in self.prices]]
+
+    @classmethod
+    def from_list(cls, data: list[Any]) -> BillSummary:
+        ym, amt, pq, prices = data
+        return cls(ym, amt, pq, tuple(tuple(p) for p in prices))  # type: ignore[misc]
+
+
+class DailySeries:
+    """按日期排序的每日用电量，数组存储并限制长度"""
+
+    __slots__ = ("_ymd", "_pq")
+
+    def __init__(self) -> None:
+        self._ymd = array("I")
+        self._pq = array("d")
+
+    def replace(self, entries: Iterable[tuple[str, float]]) -> None:
+        """用新的 (YYYYMMDD, kWh) 列表替换，只保留最近 DAILY_RETENTION 天"""
+        merged = dict(zip(self._ymd, self._pq))
+        for ymd, pq in entries:
+            merged[int(ymd)] = float(pq)
+        keys = sorted(merged)[-DAILY_RETENTION:]
+        self._ymd = array("I", keys)
+        self._pq = array("d", (merged[k] for k in keys))
+
+    def since(self, ymd: str) -> Iterator[tuple[str, float]]:
+        """ymd（含）之后的条目，二分定位起点"""
+        for i in range(bisect_left(self._ymd, int(ymd)), len(self._ymd)):
+            yield str(self._ymd[i]), self._pq[i]
+
+    def latest(self) -> tuple[str, float] | None:
+        if not self._ymd:
+            return None
+        return str(self._ymd[-1]), self._pq[-1]
+
+    def __iter__(self) -> Iterator[tuple[str, float]]:
+        for ymd, pq in zip(self._ymd, self._pq):
+            yield str(ymd), pq
+
+    def __len__(self) -> int:
+        return len(self._ymd)
+
+
+class SxgjdlSnapshot:
+    """单个户号的最新数据
+
+    只保存传感器用到的字段：标量用 __slots__，月度/每日序列用数组，
+    账单只保留摘要。协调器每次刷新就地更新，不复制整个字典。
+    派生结果（公共属性、月度汇总等）按 generation 缓存，所有实体共用。
+    """
+
+    __slots__ = (
+        *SCALAR_FIELDS,
+        "record_year",
+        "monthly_usage",
+        "monthly_amt",
+        "monthly_mask",
+        "daily",
+        "bills",
+        "last_updated",
+        "using_cache",
+        "restored_at",
+        "generation",
+        "_memo",
+        "_memo_generation",
+    )
+
+    def __init__(self) -> None:
+        for name in SCALAR_FIELDS:
+            setattr(self, name, None)
+        self.record_year: int | None = None
+        self.monthly_usage = array("d", [0.0] * 12)
+        self.monthly_amt = array("d", [0.0] * 12)
+        # 第 m-1 位为 1 表示该月有记录
+        self.monthly_mask = 0
+        self.daily = DailySeries()
+        self.bills: tuple[BillSummary, ...] = ()
+        self.last_updated: str | None = None
+        self.using_cache = False
+        self.restored_at: str | None = None
+        # 每次数据变化递增，供实体/缓存判断是否需要重新计算
+        self.generation = 0
+        self._memo: dict[str, Any] = {}
+        self._memo_generation = -1
+
+    @property
+    def has_data(self) -> bool:
+        return self.last_updated is not None
+
+    # ------------------------------------------------------------------ #
+    #  更新                                                                #
+    # ------------------------------------------------------------------ #
+
+    def apply(self, values: dict[str, Any]) -> None:
+        """合并一次刷新的结果（只覆盖出现的字段）"""
+        for key, value in values.items():
+            if key == "monthly":
+                self._set_monthly(values.get("record_year"), value)
+            elif key == "daily":
+                self.daily.replace(value)
+            elif key == "bills":
+                self.bills = tuple(value[:BILL_RETENTION])
+            elif key in SCALAR_FIELDS:
+                setattr(self, key, value)
+
+    def _set_monthly(self, year: int | None, months: Iterable[tuple[int, float, float]]) -> None:
+        if year != self.record_year:
+            # 跨年：清空上一年的月度数据
+            self.record_year = year
+            self.monthly_mask = 0
+            for i in range(12):
+                self.monthly_usage[i] = 0.0
+                self.monthly_amt[i] = 0.0
+        for month, usage, amt in months:
+            self.monthly_usage[month - 1] = usage
+            self.monthly_amt[month - 1] = amt
+            self.monthly_mask |= 1 << (month - 1)
+
+    # ------------------------------------------------------------------ #
+    #  读取（兼容原字典键）                                                 #
+    # ------------------------------------------------------------------ #
+
+    def cached(self, key: str, build: Callable[[SxgjdlSnapshot], _T]) -> _T:
+        """同一 generation 内只计算一次；返回值被共享，调用方不要修改"""
+        if self._memo_generation != self.generation:
+            self._memo = {}
+            self._memo_generation = self.generation
+        if key not in self._memo:
+            self._memo[key] = build(self)
+        return self._memo[key]
+
+    def monthly(self) -> Iterator[tuple[int, float, float]]:
+        """有记录的月份 (月, 用电量, 电费)"""
+        for i in range(12):
+            if self.monthly_mask & (1 << i):
+                yield i + 1, self.monthly_usage[i], self.monthly_amt[i]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in SCALAR_FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        if key.startswith(("monthly_usage_", "monthly_amt_")):
+            month = int(key[-2:])
+            if not 1 <= month <= 12 or not self.monthly_mask & (1 << (month - 1)):
+                return default
+            series = self.monthly_usage if key.startswith("monthly_usage_") else self.monthly_amt
+            return series[month - 1]
+        if key == "monthly_summary":
+            if self.record_year is None:
+                return default
+            return self.cached("monthly_summary", _build_monthly_summary)
+        if key == "_last_updated":
+            return self.last_updated if self.last_updated is not None else default
+        if key == "_using_cache":
+            return self.using_cache
+        if key == "_restored_at":
+            return self.restored_at if self.restored_at is not None else default
+        return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    # ------------------------------------------------------------------ #
+    #  持久化                                                              #
+    # ------------------------------------------------------------------ #
+
+    def as_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            name: getattr(self, name)
+            for name in SCALAR_FIELDS
+            if getattr(self, name) is not None
+        }
+        data["record_year"] = self.record_year
+        data["monthly"] = [list(m) for m in self.monthly()]
+        data["daily"] = [list(d) for d in self.daily]
+        data["bills"] = [bill.as_list() for bill in self.bills]
+        data["last_updated"] = self.last_updated
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> SxgjdlSnapshot:
+        snapshot = cls()
+        snapshot.apply({k: v for k, v in data.items() if k in SCALAR_FIELDS})
+        snapshot._set_monthly(
+            data.get("record_year"), (tuple(m) for m in data.get("monthly", []))
+        )
+        snapshot.daily.replace(tuple(d) for d in data.get("daily", []))
+        snapshot.bills = tuple(BillSummary.from_list(b) for b in data.get("bills", []))
+        # 兼容旧版按原始字典保存的快照
+        snapshot.last_updated = data.get("last_updated") or data.get("_last_updated")
+        return snapshot
+
+
+def _build_monthly_summary(snapshot: SxgjdlSnapshot) -> dict[str, Any]:
+    return {
+        "year": snapshot.record_year,
+        "months": [
+            {
+                "month": month,
+                "name": MONTH_NAMES[month],
+                "usage_kwh": usage,
+                "amount_yuan": amt,
+            }
+            for month, usage, amt in snapshot.monthly()
+        ],
+    }
@@ -0,0 +1,136 @@
+"""山西地电用电查询 - 重试、熔断与维护时段识别"""
+from __future__ import annotations
+
+import random
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from typing import Any
+
+# 瞬时错误重试：指数退避 + 抖动
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0   # 秒
+RETRY_MAX_DELAY = 10.0   # 秒
+
+# 熔断：连续失败（重试用完仍失败的调用）达到阈值后打开，冷却期满后放行一次半开探测
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RECOVERY_TIMEOUT = 600  # 秒
+
+# 维护时段：同一小时在不同日期多次整体失败即视为固定维护时段
+MAINTENANCE_MIN_DAYS = 3
+MAINTENANCE_HISTORY_DAYS = 28
+# 维护时段内仍按此间隔探测一次，以便服务恢复后尽快取消暂停
+MAINTENANCE_PROBE_INTERVAL = timedelta(minutes=30)
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次（从 0 开始）重试前的等待秒数"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.5)
+
+
+class CircuitBreaker:
+    """单个接口的熔断器：closed -> open -> half_open -> closed/open"""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or self._clock() - self._opened_at >= self._recovery_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def retry_in(self) -> float:
+        """距离允许半开探测还有多少秒"""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._recovery_timeout - (self._clock() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """是否放行请求；半开状态只放行一个探测请求"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """探测请求结束但未计入成功或失败（如被取消）时释放探测名额"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self._failure_threshold:
+            # 探测失败或达到阈值：重新打开并开始新的冷却期
+            self._opened_at = self._clock()
+            self._probing = False
+
+
+class MaintenanceTracker:
+    """从整体失败的时间点学习服务器的固定维护时段（按一天中的小时）"""
+
+    def __init__(self) -> None:
+        # {小时: {出现整体失败的日期}}
+        self._outages: dict[int, set[date]] = defaultdict(set)
+
+    def record_outage(self, now: datetime) -> None:
+        self._outages[now.hour].add(now.date())
+        self._prune(now.date())
+
+    def record_success(self, now: datetime) -> None:
+        """该小时内请求成功，说明并非固定维护，清除该小时的记录"""
+        self._outages.pop(now.hour, None)
+
+    def _prune(self, today: date) -> None:
+        cutoff = today - timedelta(days=MAINTENANCE_HISTORY_DAYS)
+        for hour in list(self._outages):
+            days = {d for d in self._outages[hour] if d >= cutoff}
+            if days:
+                self._outages[hour] = days
+            else:
+                del self._outages[hour]
+
+    @property
+    def windows(self) -> list[int]:
+        """已识别的维护小时"""
+        return sorted(
+            hour for hour, days in self._outages.items() if len(days) >= MAINTENANCE_MIN_DAYS
+        )
+
+    def in_window(self, now: datetime) -> bool:
+        return now.hour in self.windows
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            str(hour): sorted(d.isoformat() for d in days)
+            for hour, days in self._outages.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> MaintenanceTracker:
+        tracker = cls()
+        for hour, days in (data or {}).items():
+            tracker._outages[int(hour)] = {date.fromisoformat(d) for d in days}
+        return tracker
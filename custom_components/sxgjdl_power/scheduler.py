@@ -0,0 +1,143 @@
+"""山西地电用电查询 - 多户号批量调度与全局限流"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import SxgjdlDataCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+# 调度节拍：每个节拍检查哪些户号到期，并把到期户号均匀分散到节拍内
+SCHEDULER_TICK = timedelta(seconds=60)
+# 新登记的户号已到期（如快照启动）时，稍等片刻再提前触发一个节拍，
+# 让同时启动的户号进入同一批次、在节拍内错开
+REGISTER_TICK_DELAY = timedelta(seconds=5)
+
+# 全局令牌桶：所有户号合计的请求速率上限
+RATE_LIMIT_PER_SECOND = 1.0
+RATE_LIMIT_BURST = 5
+
+
+class SxgjdlTokenBucket:
+    """令牌桶限流器，所有户号共享"""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """取一个令牌，不足时等待（先到先得）"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class SxgjdlBatchScheduler:
+    """域级批量调度器：统一驱动所有户号的刷新
+
+    各户号的协调器不再各自计时，而是由调度器在每个节拍检查到期的户号，
+    将它们错开启动；实际请求再经过全局令牌桶限流，户号再多也不会突发。
+    各协调器按自己的相位到期，同时登记的户号之后也分散在整个刷新间隔内。
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.rate_limiter = SxgjdlTokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+        self._coordinators: dict[str, SxgjdlDataCoordinator] = {}
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._running: asyncio.Task | None = None
+        self._unsub_kick: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_register(self, coordinator: SxgjdlDataCoordinator) -> None:
+        """登记一个户号的协调器"""
+        self._coordinators[coordinator.client.cons_no] = coordinator
+        if self._unsub_timer is None:
+            self._unsub_timer = async_track_time_interval(
+                self.hass, self._async_tick, SCHEDULER_TICK
+            )
+        if coordinator.refresh_due and self._unsub_kick is None:
+            self._unsub_kick = async_call_later(self.hass, REGISTER_TICK_DELAY, self._async_kick)
+
+    @callback
+    def _async_kick(self, now: datetime) -> None:
+        self._unsub_kick = None
+        self._async_tick(now)
+
+    @callback
+    def async_unregister(self, coordinator: SxgjdlDataCoordinator) -> bool:
+        """注销协调器，返回调度器是否已空闲（可释放）"""
+        self._coordinators.pop(coordinator.client.cons_no, None)
+        if self._coordinators:
+            return False
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._unsub_kick is not None:
+            self._unsub_kick()
+            self._unsub_kick = None
+        if self._running is not None and not self._running.done():
+            self._running.cancel()
+        return True
+
+    @callback
+    def _async_tick(self, _now: datetime) -> None:
+        if self._running is not None and not self._running.done():
+            # 上一批尚未完成，跳过本节拍
+            return
+        due = [c for c in self._coordinators.values() if c.refresh_due]
+        if due:
+            self._running = self.hass.async_create_background_task(
+                self._async_refresh_batch(due), f"{DOMAIN}_batch_refresh"
+            )
+
+    async def _async_refresh_batch(self, due: list[SxgjdlDataCoordinator]) -> None:
+        """将到期户号均匀分散在一个节拍内启动"""
+        spacing = SCHEDULER_TICK.total_seconds() / len(due)
+        tasks: list[asyncio.Task] = []
+        for index, coordinator in enumerate(due):
+            if index:
+                await asyncio.sleep(spacing)
+            tasks.append(asyncio.create_task(coordinator.async_scheduled_refresh()))
+        _LOGGER.debug("批量刷新 %d 个户号，间隔 %.1f 秒", len(due), spacing)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> SxgjdlBatchScheduler:
+    """获取（必要时创建）域级调度器"""
+    scheduler: SxgjdlBatchScheduler | None = hass.data.get(DATA_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_SCHEDULER] = SxgjdlBatchScheduler(hass)
+    return scheduler
+
+
+@callback
+def async_release_scheduler(hass: HomeAssistant, coordinator: SxgjdlDataCoordinator) -> None:
+    """注销协调器，最后一个户号卸载时释放调度器"""
+    scheduler: SxgjdlBatchScheduler | None = hass.data.get(DATA_SCHEDULER)
+    if scheduler is not None and scheduler.async_unregister(coordinator):
+        hass.data.pop(DATA_SCHEDULER)
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -13,14 +13,26 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfTime
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_time
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-
-from .const import DOMAIN, CONF_CONS_NO
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_CONS_NO,
+    API_FEES,
+    API_CONS_INFO,
+    API_RECORD_LIST,
+    API_LIST_BY_YEAR,
+    API_DAYS_OF_MONTH,
+    API_DAYS_ONLY,
+)
 from .coordinator import SxgjdlDataCoordinator
+from .model import SxgjdlSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,6 +45,16 @@ MONTH_NAMES = {
     9: "九月", 10: "十月", 11: "十一月", 12: "十二月",
 }
 
+# 接口诊断传感器名称
+ENDPOINT_LABELS = {
+    API_FEES: "余额接口",
+    API_CONS_INFO: "户号信息接口",
+    API_RECORD_LIST: "月度记录接口",
+    API_LIST_BY_YEAR: "年度账单接口",
+    API_DAYS_OF_MONTH: "每日用电接口",
+    API_DAYS_ONLY: "分时用电接口",
+}
+
 
 @dataclass(frozen=True)
 class SxgjdlSensorEntityDescription(SensorEntityDescription):
@@ -49,6 +71,11 @@ FIXED_SENSOR_DESCRIPTIONS: tuple[SxgjdlSensorEntityDescription, ...] = (
         native_unit_of_measurement=UNIT_YUAN,
         state_class=SensorStateClass.TOTAL, icon="mdi:cash",
     ),
+    SxgjdlSensorEntityDescription(
+        key="balance_days_left", data_key="balance_days_left", name="余额可用天数",
+        native_unit_of_measurement=UnitOfTime.DAYS,
+        state_class=SensorStateClass.MEASUREMENT, icon="mdi:calendar-clock",
+    ),
     SxgjdlSensorEntityDescription(
         key="rcv_amt_total", data_key="rcv_amt_total", name="应收电费",
         native_unit_of_measurement=UNIT_YUAN,
@@ -58,7 +85,7 @@ FIXED_SENSOR_DESCRIPTIONS: tuple[SxgjdlSensorEntityDescription, ...] = (
         key="unit_price", data_key="unit_price", name="当前电价",
         native_unit_of_measurement="元/kWh",
         state_class=SensorStateClass.MEASUREMENT, icon="mdi:currency-cny",
-        extra_attrs_keys=["price_name"],
+        extra_attrs_keys=["price_name", "tariff_tier", "year_usage_to_date"],
     ),
     SxgjdlSensorEntityDescription(
         key="today_usage", data_key="today_usage", name="昨日用电量",
@@ -82,6 +109,12 @@ FIXED_SENSOR_DESCRIPTIONS: tuple[SxgjdlSensorEntityDescription, ...] = (
         native_unit_of_measurement=UNIT_YUAN,
         state_class=SensorStateClass.MEASUREMENT, icon="mdi:chart-areaspline",
     ),
+    SxgjdlSensorEntityDescription(
+        key="month_projected_amt", data_key="month_projected_amt", name="本月预计电费",
+        native_unit_of_measurement=UNIT_YUAN,
+        state_class=SensorStateClass.MEASUREMENT, icon="mdi:chart-timeline-variant",
+        extra_attrs_keys=["tariff_tier"],
+    ),
     SxgjdlSensorEntityDescription(
         key="last_month_usage", data_key="last_month_usage", name="上月用电量",
         native_unit_of_measurement=UNIT_KWH,
@@ -111,7 +144,7 @@ FIXED_SENSOR_DESCRIPTIONS: tuple[SxgjdlSensorEntityDescription, ...] = (
 
 
 # ------------------------------------------------------------------ #
-#  async_setup_entry：固定传感器 + 动态年度月度传感器                  #
+#  async_setup_entry：固定传感器 + 按年度切换的月度传感器              #
 # ------------------------------------------------------------------ #
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -121,35 +154,58 @@ async def async_setup_entry(
     coordinator: SxgjdlDataCoordinator = hass.data[DOMAIN][entry.entry_id]
     cons_no = entry.data[CONF_CONS_NO]
 
-    # 已注册过的年份，避免跨年重复注册
-    registered_years: set[int] = set()
-
     entities: list[SensorEntity] = []
 
     # 1. 固定传感器
     for desc in FIXED_SENSOR_DESCRIPTIONS:
         entities.append(SxgjdlSensor(coordinator, desc, cons_no, entry))
 
-    # 2. 首次注册当前年度的月度传感器
-    current_year = datetime.now().year
-    entities.extend(_build_yearly_entities(coordinator, cons_no, entry, current_year))
-    registered_years.add(current_year)
+    # 2. 当前年度的月度传感器；跨年时复用同一批实体，不再新增
+    monthly_entities = _build_yearly_entities(coordinator, cons_no, entry, datetime.now().year)
+    entities.extend(monthly_entities)
 
     # 3. 年度汇总传感器（state = 年累计，attributes = 各月明细）
     entities.append(SxgjdlYearlySummarySensor(coordinator, cons_no, entry))
 
+    # 4. 最后成功更新时间（唯一随每次刷新变化的实体）
+    entities.append(SxgjdlLastUpdateSensor(coordinator, cons_no, entry))
+
+    # 5. 预计余额耗尽时间
+    entities.append(SxgjdlBalanceDepletionSensor(coordinator, cons_no, entry))
+
+    # 6. 接口诊断传感器（默认禁用）
+    for path, label in ENDPOINT_LABELS.items():
+        entities.append(SxgjdlEndpointStatsSensor(coordinator, cons_no, entry, path, label))
+
     async_add_entities(entities)
 
-    # 4. 监听 coordinator 更新，跨年时动态添加新年度传感器
-    async def _check_new_year(_):
-        year = datetime.now().year
-        if year not in registered_years:
-            _LOGGER.info("检测到新年份 %d，自动注册月度传感器", year)
-            new_entities = _build_yearly_entities(coordinator, cons_no, entry, year)
-            async_add_entities(new_entities)
-            registered_years.add(year)
+    # 7. 在下一个元旦零点切换月度传感器的年份（往年数据见长期统计）
+    cancel_rollover: CALLBACK_TYPE | None = None
+
+    @callback
+    def _async_year_rollover(now: datetime) -> None:
+        nonlocal cancel_rollover
+        _LOGGER.info("进入新年份 %d，月度传感器切换到新年度", now.year)
+        for entity in monthly_entities:
+            entity.async_set_year(now.year)
+        cancel_rollover = _schedule_rollover()
+
+    def _schedule_rollover() -> CALLBACK_TYPE:
+        next_year = dt_util.now().year + 1
+        return async_track_point_in_time(
+            hass,
+            _async_year_rollover,
+            dt_util.start_of_local_day(date(next_year, 1, 1)),
+        )
 
-    coordinator.async_add_listener(_check_new_year)
+    cancel_rollover = _schedule_rollover()
+
+    @callback
+    def _cancel_rollover() -> None:
+        if cancel_rollover is not None:
+            cancel_rollover()
+
+    entry.async_on_unload(_cancel_rollover)
 
 
 def _build_yearly_entities(
@@ -157,9 +213,9 @@ def _build_yearly_entities(
     cons_no: str,
     entry: ConfigEntry,
     year: int,
-) -> list[SensorEntity]:
+) -> list[SxgjdlMonthlyBaseSensor]:
     """为指定年份生成 24 个月度传感器（12个用电量 + 12个电费）"""
-    entities: list[SensorEntity] = []
+    entities: list[SxgjdlMonthlyBaseSensor] = []
     for m in range(1, 13):
         entities.append(SxgjdlMonthlyUsageSensor(coordinator, cons_no, entry, year, m))
         entities.append(SxgjdlMonthlyAmtSensor(coordinator, cons_no, entry, year, m))
@@ -167,18 +223,21 @@ def _build_yearly_entities(
 
 
 # ------------------------------------------------------------------ #
-#  通用固定传感器                                                       #
+#  传感器基类：状态未变化时不写入                                       #
 # ------------------------------------------------------------------ #
-class SxgjdlSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
-    entity_description: SxgjdlSensorEntityDescription
-    _attr_has_entity_name = True
+class SxgjdlBaseSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
+    """所有传感器的基类
 
-    def __init__(self, coordinator, description, cons_no, entry):
-        super().__init__(coordinator)
-        self.entity_description = description
-        self._cons_no = cons_no
-        self._entry = entry
-        self._attr_unique_id = f"{cons_no}_{description.key}"
+    协调器每次刷新都会通知全部实体；数据 generation 未变时直接跳过，
+    只有数值、属性或可用性真正变化时才写入状态，避免 recorder 为未变化的
+    实体重复记录。
+    """
+
+    _cons_no: str
+    _last_written: tuple | None = None
+    _last_generation: tuple[int, int] | None = None
+    # 状态只取决于协调器数据；为 False 时每次更新都重新比较
+    _data_bound = True
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -189,6 +248,47 @@ class SxgjdlSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
         # 有缓存数据就视为可用，不显示"未知"
         return self.coordinator.data is not None
 
+    def _data_generation(self) -> tuple[int, int] | None:
+        data = self.coordinator.data
+        return None if data is None else (id(data), data.generation)
+
+    def _state_signature(self) -> tuple:
+        if not self.available:
+            return (False,)
+        return (True, self.native_value, self.extra_state_attributes)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._last_generation = self._data_generation()
+        self._last_written = self._state_signature()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        generation = self._data_generation()
+        if self._data_bound and generation == self._last_generation:
+            return
+        self._last_generation = generation
+        signature = self._state_signature()
+        if signature == self._last_written:
+            return
+        self._last_written = signature
+        self.async_write_ha_state()
+
+
+# ------------------------------------------------------------------ #
+#  通用固定传感器                                                       #
+# ------------------------------------------------------------------ #
+class SxgjdlSensor(SxgjdlBaseSensor):
+    entity_description: SxgjdlSensorEntityDescription
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, description, cons_no, entry):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._cons_no = cons_no
+        self._entry = entry
+        self._attr_unique_id = f"{cons_no}_{description.key}"
+
     @property
     def native_value(self) -> Any:
         if self.coordinator.data is None:
@@ -197,25 +297,27 @@ class SxgjdlSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        data = self.coordinator.data or {}
+        data = self.coordinator.data
+        if data is None:
+            return {}
         attrs: dict[str, Any] = {}
         for k in self.entity_description.extra_attrs_keys:
             if k in data:
-                attrs[k] = data[k]
-        attrs.update(_common_attrs(data))
+                attrs[k] = data.get(k)
+        attrs.update(data.cached("common_attrs", _common_attrs))
         return attrs
 
 
 # ------------------------------------------------------------------ #
-#  月度用电量传感器（带年份）                                           #
+#  月度传感器基类（带年份）                                             #
 # ------------------------------------------------------------------ #
-class SxgjdlMonthlyUsageSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
-    """某年某月用电量，例如：2026年一月用电量"""
+class SxgjdlMonthlyBaseSensor(SxgjdlBaseSensor):
+    """某年某月的数值；unique_id 不含年份，跨年时切换年份而不是新建实体"""
 
     _attr_has_entity_name = True
-    _attr_device_class = SensorDeviceClass.ENERGY
     _attr_state_class = SensorStateClass.TOTAL
-    _attr_icon = "mdi:lightning-bolt-circle"
+    _key_prefix: str
+    _name_suffix: str
 
     def __init__(self, coordinator, cons_no, entry, year: int, month: int):
         super().__init__(coordinator)
@@ -223,134 +325,187 @@ class SxgjdlMonthlyUsageSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorE
         self._entry = entry
         self._year = year
         self._month = month
-        self._data_key = f"monthly_usage_{month:02d}"
-        self._attr_unique_id = f"{cons_no}_monthly_usage_{month:02d}"
-        self._attr_name = f"{MONTH_NAMES[month]}用电量"
-        self._attr_native_unit_of_measurement = UNIT_KWH
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return _device_info(self.coordinator, self._cons_no)
+        self._data_key = f"{self._key_prefix}_{month:02d}"
+        self._attr_unique_id = f"{cons_no}_{self._key_prefix}_{month:02d}"
+        self._attr_name = f"{MONTH_NAMES[month]}{self._name_suffix}"
 
-    @property
-    def available(self) -> bool:
-        return self.coordinator.data is not None
+    @callback
+    def async_set_year(self, year: int) -> None:
+        """跨年切换：新年份数据到达前显示为未知"""
+        self._year = year
+        if self.hass is not None:
+            self._last_generation = None
+            self._handle_coordinator_update()
 
     @property
     def native_value(self) -> Any:
-        data = self.coordinator.data or {}
-        if data.get("current_year") == self._year or datetime.now().year == self._year:
-            return data.get(self._data_key)
-        return None
+        data = self.coordinator.data
+        if data is None or data.record_year != self._year:
+            return None
+        return data.get(self._data_key)
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        data = self.coordinator.data or {}
         attrs = {
             "年份": self._year,
             "月份": self._month,
             "月份名称": MONTH_NAMES[self._month],
         }
-        attrs.update(_common_attrs(data))
+        if self.coordinator.data is not None:
+            attrs.update(self.coordinator.data.cached("common_attrs", _common_attrs))
         return attrs
 
 
+class SxgjdlMonthlyUsageSensor(SxgjdlMonthlyBaseSensor):
+    """某年某月用电量，例如：2026年一月用电量"""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_icon = "mdi:lightning-bolt-circle"
+    _attr_native_unit_of_measurement = UNIT_KWH
+    _key_prefix = "monthly_usage"
+    _name_suffix = "用电量"
+
+
+class SxgjdlMonthlyAmtSensor(SxgjdlMonthlyBaseSensor):
+    """某年某月电费，例如：2026年一月电费"""
+
+    _attr_icon = "mdi:cash-multiple"
+    _attr_native_unit_of_measurement = UNIT_YUAN
+    _key_prefix = "monthly_amt"
+    _name_suffix = "电费"
+
+
 # ------------------------------------------------------------------ #
-#  月度电费传感器（带年份）                                             #
+#  年度汇总传感器                                                       #
 # ------------------------------------------------------------------ #
-class SxgjdlMonthlyAmtSensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
-    """某年某月电费，例如：2026年一月电费"""
+class SxgjdlYearlySummarySensor(SxgjdlBaseSensor):
+    """年度汇总：state = 本年累计用电量，attributes = 年份、年累计电费和户号信息
+
+    各月明细通过 WebSocket 命令 sxgjdl_power/history（series=monthly）获取。
+    """
 
     _attr_has_entity_name = True
-    _attr_state_class = SensorStateClass.TOTAL
-    _attr_icon = "mdi:cash-multiple"
+    _attr_icon = "mdi:chart-bar"
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UNIT_KWH
 
-    def __init__(self, coordinator, cons_no, entry, year: int, month: int):
+    def __init__(self, coordinator, cons_no, entry):
         super().__init__(coordinator)
         self._cons_no = cons_no
         self._entry = entry
-        self._year = year
-        self._month = month
-        self._data_key = f"monthly_amt_{month:02d}"
-        self._attr_unique_id = f"{cons_no}_monthly_amt_{month:02d}"
-        self._attr_name = f"{MONTH_NAMES[month]}电费"
-        self._attr_native_unit_of_measurement = UNIT_YUAN
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return _device_info(self.coordinator, self._cons_no)
-
-    @property
-    def available(self) -> bool:
-        return self.coordinator.data is not None
+        self._attr_unique_id = f"{cons_no}_yearly_monthly_detail"
+        self._attr_name = "年度各月用电明细"
 
     @property
     def native_value(self) -> Any:
         data = self.coordinator.data or {}
-        if data.get("current_year") == self._year or datetime.now().year == self._year:
-            return data.get(self._data_key)
-        return None
+        return data.get("year_total_usage")
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
+        data = self.coordinator.data
+        if data is None:
+            return {}
+        # 逐月明细通过 WebSocket sxgjdl_power/history 按需查询，不写入状态属性
+        return data.cached("yearly_attrs", _yearly_attrs)
+
+
+# ------------------------------------------------------------------ #
+#  最后成功更新时间                                                     #
+# ------------------------------------------------------------------ #
+class SxgjdlLastUpdateSensor(SxgjdlBaseSensor):
+    """最后一次成功从服务器获取数据的时间"""
+
+    _attr_has_entity_name = True
+    _attr_icon = "mdi:update"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, cons_no, entry):
+        super().__init__(coordinator)
+        self._cons_no = cons_no
+        self._entry = entry
+        self._attr_unique_id = f"{cons_no}_last_updated"
+        self._attr_name = "最后成功更新"
+
+    @property
+    def native_value(self) -> datetime | None:
         data = self.coordinator.data or {}
-        attrs = {
-            "年份": self._year,
-            "月份": self._month,
-            "月份名称": MONTH_NAMES[self._month],
-        }
-        attrs.update(_common_attrs(data))
-        return attrs
+        last_updated = data.get("_last_updated")
+        if not last_updated:
+            return None
+        parsed = dt_util.parse_datetime(last_updated)
+        if parsed is not None and parsed.tzinfo is None:
+            # 旧版快照保存的是不带时区的本地时间
+            parsed = parsed.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        return parsed
 
 
 # ------------------------------------------------------------------ #
-#  年度汇总传感器                                                       #
+#  预计余额耗尽时间                                                     #
 # ------------------------------------------------------------------ #
-class SxgjdlYearlySummarySensor(CoordinatorEntity[SxgjdlDataCoordinator], SensorEntity):
-    """年度汇总：state = 本年累计用电量，attributes = 各月明细"""
+class SxgjdlBalanceDepletionSensor(SxgjdlBaseSensor):
+    """按日均用电和当前电价推算的余额耗尽时间"""
 
     _attr_has_entity_name = True
-    _attr_icon = "mdi:chart-bar"
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_state_class = SensorStateClass.TOTAL_INCREASING
-    _attr_native_unit_of_measurement = UNIT_KWH
+    _attr_icon = "mdi:cash-remove"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
 
     def __init__(self, coordinator, cons_no, entry):
         super().__init__(coordinator)
         self._cons_no = cons_no
         self._entry = entry
-        self._attr_unique_id = f"{cons_no}_yearly_monthly_detail"
-        self._attr_name = "年度各月用电明细"
+        self._attr_unique_id = f"{cons_no}_balance_depletion_at"
+        self._attr_name = "预计余额耗尽时间"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        return _device_info(self.coordinator, self._cons_no)
+    def native_value(self) -> datetime | None:
+        data = self.coordinator.data or {}
+        depletion_at = data.get("balance_depletion_at")
+        return dt_util.parse_datetime(depletion_at) if depletion_at else None
 
     @property
-    def available(self) -> bool:
-        return self.coordinator.data is not None
+    def extra_state_attributes(self) -> dict[str, Any]:
+        data = self.coordinator.data
+        if data is None:
+            return {}
+        attrs: dict[str, Any] = {"余额可用天数": data.get("balance_days_left")}
+        attrs.update(data.cached("common_attrs", _common_attrs))
+        return attrs
+
+
+# ------------------------------------------------------------------ #
+#  接口诊断传感器                                                       #
+# ------------------------------------------------------------------ #
+class SxgjdlEndpointStatsSensor(SxgjdlBaseSensor):
+    """单个接口的 p95 延迟，attributes = 请求/错误/超时/缓存命中等统计"""
+
+    _attr_has_entity_name = True
+    _attr_icon = "mdi:timer-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    # 统计随每次请求变化，与数据 generation 无关
+    _data_bound = False
+
+    def __init__(self, coordinator, cons_no, entry, path: str, label: str):
+        super().__init__(coordinator)
+        self._cons_no = cons_no
+        self._entry = entry
+        self._path = path
+        self._attr_unique_id = f"{cons_no}_api_stats_{path.strip('/')}"
+        self._attr_name = f"{label}延迟"
 
     @property
     def native_value(self) -> Any:
-        data = self.coordinator.data or {}
-        return data.get("year_total_usage")
+        return self.coordinator.client.stats.endpoint(self._path).percentile(95)
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        data = self.coordinator.data or {}
-        summary = data.get("monthly_summary", {})
-        year = summary.get("year", datetime.now().year)
-        attrs: dict[str, Any] = {
-            "年份": year,
-            "年累计电费(元)": data.get("year_total_amt", 0.0),
-        }
-        for m_data in summary.get("months", []):
-            name = m_data.get("name", "")
-            if name:
-                attrs[f"{year}年{name}用电量(kWh)"] = m_data.get("usage_kwh", 0)
-                attrs[f"{year}年{name}电费(元)"] = m_data.get("amount_yuan", 0.0)
-        attrs.update(_common_attrs(data))
-        return attrs
+        return self.coordinator.client.stats.endpoint(self._path).as_dict()
 
 
 # ------------------------------------------------------------------ #
@@ -371,19 +526,31 @@ def _device_info(coordinator: SxgjdlDataCoordinator, cons_no: str) -> DeviceInfo
     )
 
 
-def _common_attrs(data: dict) -> dict[str, Any]:
+def _yearly_attrs(data: SxgjdlSnapshot) -> dict[str, Any]:
+    summary = data.get("monthly_summary", {})
+    year = summary.get("year", datetime.now().year)
+    attrs: dict[str, Any] = {
+        "年份": year,
+        "年累计电费(元)": data.get("year_total_amt", 0.0),
+    }
+    attrs.update(data.cached("common_attrs", _common_attrs))
+    return attrs
+
+
+def _common_attrs(data: SxgjdlSnapshot) -> dict[str, Any]:
     attrs = {}
     if "cons_name" in data:
-        attrs["户名"] = data["cons_name"]
+        attrs["户名"] = data.get("cons_name")
     if "elec_addr" in data:
-        attrs["用电地址"] = data["elec_addr"]
+        attrs["用电地址"] = data.get("elec_addr")
     if "org_name" in data:
-        attrs["供电所"] = data["org_name"]
+        attrs["供电所"] = data.get("org_name")
     if "last_mr_date" in data:
-        attrs["上次抄表日期"] = data["last_mr_date"]
+        attrs["上次抄表日期"] = data.get("last_mr_date")
     # 维护期间使用缓存时显示提示
     if data.get("_using_cache"):
         attrs["⚠️ 数据来源"] = "缓存（服务器维护中）"
-    if "_last_updated" in data:
-        attrs["最后成功更新"] = data["_last_updated"]
+    elif data.get("_restored_at"):
+        # 重启后尚未完成刷新，显示快照保存时间
+        attrs["⚠️ 数据来源"] = f"快照（保存于 {data.get('_restored_at')}）"
     return attrs
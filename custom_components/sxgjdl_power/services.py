@@ -0,0 +1,144 @@
+"""山西地电用电查询 - 服务"""
+from __future__ import annotations
+
+import logging
+from datetime import date
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import DOMAIN, CONF_CONS_NO, HISTORY_SERIES, SERIES_DAILY
+from .coordinator import REFRESH_GROUPS, SxgjdlDataCoordinator
+from .export import EXPORT_FORMATS, FORMAT_CSV, async_export_history
+from .history import last_settled_day
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BACKFILL_TOU = "backfill_tou"
+SERVICE_REFRESH = "refresh"
+SERVICE_EXPORT_HISTORY = "export_history"
+
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_GROUPS = "groups"
+ATTR_SERIES = "series"
+ATTR_FORMAT = "format"
+ATTR_INCLUDE_TOU = "include_tou"
+
+# 单次补齐的最大天数
+MAX_BACKFILL_DAYS = 366 * 3
+
+BACKFILL_TOU_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_CONS_NO): cv.string,
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+    }
+)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_CONS_NO): cv.string,
+        vol.Optional(ATTR_GROUPS, default=list(REFRESH_GROUPS)): vol.All(
+            cv.ensure_list, [vol.In(REFRESH_GROUPS)]
+        ),
+    }
+)
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_CONS_NO): cv.string,
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_SERIES, default=SERIES_DAILY): vol.In(HISTORY_SERIES),
+        vol.Optional(ATTR_FORMAT, default=FORMAT_CSV): vol.In(EXPORT_FORMATS),
+        vol.Optional(ATTR_INCLUDE_TOU, default=False): cv.boolean,
+    }
+)
+
+
+def _get_coordinators(hass: HomeAssistant, cons_no: str | None) -> list[SxgjdlDataCoordinator]:
+    """按户号查找协调器；未指定户号时返回全部"""
+    coordinators: list[SxgjdlDataCoordinator] = list(hass.data.get(DOMAIN, {}).values())
+    if cons_no:
+        coordinators = [c for c in coordinators if c.client.cons_no == cons_no]
+        if not coordinators:
+            raise HomeAssistantError(f"未找到户号 {cons_no}")
+    return coordinators
+
+
+async def _async_backfill_tou(hass: HomeAssistant, call: ServiceCall) -> None:
+    """补齐日期区间内的每日峰/平/谷用电并导入长期统计"""
+    start: date = call.data[ATTR_START_DATE]
+    ranges: list[tuple[SxgjdlDataCoordinator, date]] = []
+    for coordinator in _get_coordinators(hass, call.data.get(CONF_CONS_NO)):
+        # 近几天的分时数据尚未结算、不会进入缓存，默认并最晚截止到最后一个已结算日；
+        # 与导入器使用同一时钟（回放录制文件时为模拟时间）
+        last_day = last_settled_day(coordinator.client.now().date())
+        end: date = min(call.data.get(ATTR_END_DATE) or last_day, last_day)
+        if start > end:
+            raise HomeAssistantError(f"开始日期不能晚于结束日期（最晚为 {last_day.isoformat()}）")
+        if (end - start).days >= MAX_BACKFILL_DAYS:
+            raise HomeAssistantError(f"单次最多补齐 {MAX_BACKFILL_DAYS} 天")
+        ranges.append((coordinator, end))
+
+    for coordinator, end in ranges:
+        await coordinator.statistics.async_backfill_tou(start, end)
+
+
+async def _async_refresh(hass: HomeAssistant, call: ServiceCall) -> None:
+    """只刷新指定数据组，例如缴费后只查余额"""
+    groups: list[str] = call.data[ATTR_GROUPS]
+    for coordinator in _get_coordinators(hass, call.data.get(CONF_CONS_NO)):
+        try:
+            await coordinator.async_refresh_groups(groups)
+        except UpdateFailed as err:
+            raise HomeAssistantError(f"户号 {coordinator.client.cons_no} 刷新失败: {err}") from err
+
+
+async def _async_export_history(hass: HomeAssistant, call: ServiceCall) -> None:
+    """把日期区间内的历史数据导出到配置目录 sxgjdl_power/ 下"""
+    start: date = call.data[ATTR_START_DATE]
+    end: date = min(call.data.get(ATTR_END_DATE) or date.today(), date.today())
+    if start > end:
+        raise HomeAssistantError("开始日期不能晚于结束日期")
+    include_tou = call.data[ATTR_INCLUDE_TOU] and call.data[ATTR_SERIES] == SERIES_DAILY
+    # 分时数据按天请求，与补齐服务使用同一上限
+    if include_tou and (end - start).days >= MAX_BACKFILL_DAYS:
+        raise HomeAssistantError(f"包含分时数据时单次最多导出 {MAX_BACKFILL_DAYS} 天")
+
+    for coordinator in _get_coordinators(hass, call.data.get(CONF_CONS_NO)):
+        await async_export_history(
+            hass,
+            coordinator.history,
+            call.data[ATTR_SERIES],
+            start,
+            end,
+            call.data[ATTR_FORMAT],
+            include_tou,
+        )
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """注册集成服务"""
+
+    async def _backfill_tou(call: ServiceCall) -> None:
+        await _async_backfill_tou(hass, call)
+
+    async def _refresh(call: ServiceCall) -> None:
+        await _async_refresh(hass, call)
+
+    async def _export_history(call: ServiceCall) -> None:
+        await _async_export_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL_TOU, _backfill_tou, schema=BACKFILL_TOU_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_REFRESH, _refresh, schema=REFRESH_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXPORT_HISTORY, _export_history, schema=EXPORT_HISTORY_SCHEMA
+    )
@@ -0,0 +1,97 @@
+"""山西地电用电查询 - 共享 HTTP 连接池"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .api import HEADERS
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SESSION = f"{DOMAIN}_session"
+
+# 所有户号共用同一个服务器，连接池按域共享
+POOL_LIMIT = 16
+POOL_LIMIT_PER_HOST = 6
+DNS_CACHE_TTL = 600      # 秒
+KEEPALIVE_TIMEOUT = 60   # 秒
+# 配置流程验证后保留连接池的时间，随后的 async_setup_entry 可直接复用
+SESSION_LINGER = timedelta(seconds=120)
+
+
+@dataclass
+class _SharedSession:
+    session: aiohttp.ClientSession
+    users: int = 0
+    # 延迟关闭的定时器（无使用者但仍在保留期内）
+    unsub_close: CALLBACK_TYPE | None = None
+
+
+@callback
+def async_acquire_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """获取共享会话（引用计数 +1），首次调用时创建连接池"""
+    shared: _SharedSession | None = hass.data.get(DATA_SESSION)
+    if shared is None or shared.session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        )
+        shared = _SharedSession(aiohttp.ClientSession(connector=connector, headers=HEADERS))
+        hass.data[DATA_SESSION] = shared
+
+        @callback
+        def _close_on_stop(_event: Event) -> None:
+            if hass.data.get(DATA_SESSION) is shared:
+                hass.data.pop(DATA_SESSION)
+                hass.async_create_task(shared.session.close())
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _close_on_stop)
+        _LOGGER.debug("已创建共享连接池")
+
+    if shared.unsub_close is not None:
+        shared.unsub_close()
+        shared.unsub_close = None
+    shared.users += 1
+    return shared.session
+
+
+async def async_release_session(hass: HomeAssistant, linger: bool = False) -> None:
+    """释放共享会话（引用计数 -1），最后一个使用者释放时关闭连接池
+
+    linger=True 时（配置流程）连接池在 SESSION_LINGER 内无人使用才关闭。
+    """
+    shared: _SharedSession | None = hass.data.get(DATA_SESSION)
+    if shared is None:
+        return
+    shared.users -= 1
+    if shared.users > 0:
+        return
+    if linger:
+        if shared.unsub_close is None:
+            @callback
+            def _close_later(_now: datetime) -> None:
+                shared.unsub_close = None
+                if shared.users <= 0 and hass.data.get(DATA_SESSION) is shared:
+                    hass.data.pop(DATA_SESSION)
+                    hass.async_create_task(shared.session.close())
+                    _LOGGER.debug("已关闭共享连接池")
+
+            shared.unsub_close = async_call_later(hass, SESSION_LINGER, _close_later)
+        return
+    if shared.unsub_close is not None:
+        shared.unsub_close()
+        shared.unsub_close = None
+    hass.data.pop(DATA_SESSION)
+    await shared.session.close()
+    _LOGGER.debug("已关闭共享连接池")
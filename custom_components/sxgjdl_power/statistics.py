@@ -0,0 +1,234 @@
+"""山西地电用电查询 - 长期统计导入（能源面板历史数据）"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import SxgjdlApiError
+from .const import DOMAIN, API_DAYS_OF_MONTH, API_DAYS_ONLY
+from .history import SxgjdlHistoryStore, is_settled, last_settled_day
+
+_LOGGER = logging.getLogger(__name__)
+
+STATISTICS_STORAGE_VERSION = 1
+
+# 首次导入最多回溯的年数，以及并发查询的年份数
+MAX_HISTORY_YEARS = 10
+BACKFILL_CONCURRENCY = 3
+# 分时数据按天查询的并发上限
+TOU_BACKFILL_CONCURRENCY = 5
+
+# 分时统计：统计名 -> (接口字段, 显示名称)
+TOU_BUCKETS = {
+    "tou_peak": ("peakPq", "峰时用电量"),
+    "tou_flat": ("flatPq", "平时用电量"),
+    "tou_valley": ("valleyPq", "谷时用电量"),
+}
+
+UNIT_YUAN = "元"
+
+
+def statistics_storage_key(cons_no: str) -> str:
+    """统计导入水位线的存储键，每个户号一个文件"""
+    return f"{DOMAIN}.statistics.{cons_no}"
+
+
+def statistic_id(cons_no: str, name: str) -> str:
+    """外部统计 ID，例如 sxgjdl_power:0209605903_monthly_usage"""
+    return f"{DOMAIN}:{cons_no}_{name}".lower()
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return dt_util.as_utc(dt_util.start_of_local_day(date(year, month, 1)))
+
+
+class SxgjdlStatisticsImporter:
+    """把历年月度用电量和电费导入 recorder 外部统计
+
+    按户号记录水位线（最后导入的月份及累计值），之后只导入新结算的月份。
+    还没有导入过时记录已完整查询到的年份，无历史数据的户号不会每次都回溯多年。
+    """
+
+    def __init__(self, hass: HomeAssistant, history: SxgjdlHistoryStore) -> None:
+        self.hass = hass
+        self.history = history
+        self.cons_no = history.client.cons_no
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STATISTICS_STORAGE_VERSION, statistics_storage_key(self.cons_no)
+        )
+        self._lock = asyncio.Lock()
+
+    @property
+    def recorder_ready(self) -> bool:
+        return "recorder" in self.hass.config.components
+
+    async def async_import_monthly(self) -> int:
+        """增量导入已结算月份，返回本次导入的月数"""
+        if not self.recorder_ready:
+            return 0
+        async with self._lock:
+            watermark = await self._store.async_load() or {}
+            today = self.history.client.now().date()
+            months, complete = await self._async_collect_months(
+                watermark.get("month"), watermark.get("scanned_year"), today
+            )
+            if complete:
+                # 上一年年底的月份可能尚未结算，下次从上一年开始查询（往年结算后走缓存）
+                watermark["scanned_year"] = today.year - 1
+            if not months:
+                if complete:
+                    await self._store.async_save(watermark)
+                return 0
+
+            usage_sum = watermark.get("usage_sum", 0.0)
+            cost_sum = watermark.get("cost_sum", 0.0)
+            usage_rows: list[dict[str, Any]] = []
+            cost_rows: list[dict[str, Any]] = []
+            for ym, usage, cost in months:
+                usage_sum += usage
+                cost_sum += cost
+                start = _month_start(int(ym[:4]), int(ym[4:]))
+                usage_rows.append({"start": start, "state": usage, "sum": round(usage_sum, 3)})
+                cost_rows.append({"start": start, "state": cost, "sum": round(cost_sum, 2)})
+
+            self._add_statistics("monthly_usage", "月度用电量", UnitOfEnergy.KILO_WATT_HOUR, usage_rows)
+            self._add_statistics("monthly_cost", "月度电费", UNIT_YUAN, cost_rows)
+
+            watermark.update(
+                month=months[-1][0],
+                usage_sum=round(usage_sum, 3),
+                cost_sum=round(cost_sum, 2),
+            )
+            await self._store.async_save(watermark)
+            _LOGGER.info("户号 %s 已导入 %d 个月的长期统计", self.cons_no, len(months))
+            return len(months)
+
+    async def _async_collect_months(
+        self, after: str | None, scanned_year: int | None, today: date
+    ) -> tuple[list[tuple[str, float, float]], bool]:
+        """查询水位线之后、已结算的每月 (年月, 用电量, 电费)，以及各年是否都查询成功"""
+        if after:
+            first_year = int(after[:4])
+        else:
+            first_year = scanned_year or today.year - MAX_HISTORY_YEARS + 1
+        years = list(range(first_year, today.year + 1))
+
+        semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+
+        async def _year(year: int) -> dict[str, tuple[float, float]] | None:
+            async with semaphore:
+                try:
+                    record, bills = await asyncio.gather(
+                        self.history.get_record_list(year),
+                        self.history.get_list_by_year(year),
+                    )
+                except SxgjdlApiError as err:
+                    _LOGGER.warning("获取 %d 年历史数据失败: %s", year, err)
+                    return None
+            # 账单金额为实际应收，优先于月度记录中的电费
+            bill_amt = {
+                b.get("rcvblYm", ""): float(b.get("rcvblAmt") or 0)
+                for b in (bills.get("data") or [])
+            }
+            result: dict[str, tuple[float, float]] = {}
+            if not record.get("flag"):
+                return result
+            for rec in (record.get("data") or {}).get("recordList", []):
+                month = rec.get("month", 0)
+                if not 1 <= month <= 12:
+                    continue
+                ym = f"{year}{month:02d}"
+                usage = float(rec.get("thisPq") or 0)
+                cost = bill_amt.get(ym, float(rec.get("prices") or 0))
+                result[ym] = (usage, cost)
+            return result
+
+        per_year = await asyncio.gather(*(_year(year) for year in years))
+        merged: dict[str, tuple[float, float]] = {}
+        for data in per_year:
+            merged.update(data or {})
+
+        # 首次导入从第一个有用电记录的月份开始，避免前面大量 0
+        months = sorted(
+            (ym, usage, cost)
+            for ym, (usage, cost) in merged.items()
+            if is_settled(API_DAYS_OF_MONTH, ym, today) and (after is None or ym > after)
+        )
+        if after is None:
+            while months and months[0][1] == 0 and months[0][2] == 0:
+                months.pop(0)
+        return months, all(data is not None for data in per_year)
+
+    async def async_backfill_tou(self, start: date, end: date) -> int:
+        """并发补齐日期区间内的每日分时数据并导入统计，返回本次请求服务器的天数
+
+        已结算的日期由历史缓存持久保存，重复执行不会再次请求服务器；
+        尚未结算的日期不会被缓存，也就无法导入统计，因此 end 最晚取最后一个已结算日。
+        """
+        end = min(end, last_settled_day(self.history.client.now().date()))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        missing = [
+            d.strftime("%Y%m%d")
+            for d in days
+            if not self.history.is_cached(API_DAYS_ONLY, d.strftime("%Y%m%d"))
+        ]
+        semaphore = asyncio.Semaphore(TOU_BACKFILL_CONCURRENCY)
+
+        async def _day(ymd: str) -> None:
+            async with semaphore:
+                try:
+                    await self.history.get_days_only_data(ymd)
+                except SxgjdlApiError as err:
+                    _LOGGER.warning("获取 %s 分时用电失败: %s", ymd, err)
+
+        await asyncio.gather(*(_day(ymd) for ymd in missing))
+        _LOGGER.info(
+            "户号 %s 分时数据补齐：%d 天中 %d 天需请求服务器",
+            self.cons_no, len(days), len(missing),
+        )
+        if self.recorder_ready:
+            self._import_tou_statistics()
+        return len(missing)
+
+    def _import_tou_statistics(self) -> None:
+        """按缓存中全部已结算日期重建分时统计（累计值从最早一天算起）"""
+        cached = self.history.cached_payloads(API_DAYS_ONLY)
+        rows: dict[str, list[dict[str, Any]]] = {name: [] for name in TOU_BUCKETS}
+        sums = dict.fromkeys(TOU_BUCKETS, 0.0)
+        for ymd in sorted(cached):
+            data = cached[ymd].get("data") or {}
+            start = dt_util.as_utc(
+                dt_util.start_of_local_day(datetime.strptime(ymd, "%Y%m%d").date())
+            )
+            for name, (field, _label) in TOU_BUCKETS.items():
+                value = float(data.get(field) or 0)
+                sums[name] += value
+                rows[name].append({"start": start, "state": value, "sum": round(sums[name], 3)})
+        for name, (_field, label) in TOU_BUCKETS.items():
+            if rows[name]:
+                self._add_statistics(name, label, UnitOfEnergy.KILO_WATT_HOUR, rows[name])
+
+    def _add_statistics(
+        self, name: str, label: str, unit: str, rows: list[dict[str, Any]]
+    ) -> None:
+        from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"山西地电 {self.cons_no} {label}",
+            source=DOMAIN,
+            statistic_id=statistic_id(self.cons_no, name),
+            unit_of_measurement=unit,
+        )
+        async_add_external_statistics(
+            self.hass, metadata, [StatisticData(**row) for row in rows]
+        )
@@ -0,0 +1,125 @@
+"""山西地电用电查询 - 接口耗时与错误统计"""
+from __future__ import annotations
+
+from typing import Any
+
+# 延迟直方图的桶上限（毫秒），最后一个桶收纳所有更慢的请求
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 15000)
+
+
+class EndpointStats:
+    """单个接口的累计统计"""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "timeouts",
+        "circuit_open",
+        "hedged",
+        "deadline_exceeded",
+        "cache_hits",
+        "cache_misses",
+        "bytes_total",
+        "last_bytes",
+        "last_latency_ms",
+        "latency_max_ms",
+        "latency_sum_ms",
+        "latency_buckets",
+    )
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.circuit_open = 0
+        # 慢请求补发的重复请求次数；超出刷新时限被取消的次数
+        self.hedged = 0
+        self.deadline_exceeded = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_total = 0
+        self.last_bytes = 0
+        self.last_latency_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.latency_sum_ms = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record_response(self, latency_ms: float, size: int) -> None:
+        self.requests += 1
+        self.bytes_total += size
+        self.last_bytes = size
+        self._record_latency(latency_ms)
+
+    def record_error(self, latency_ms: float, timeout: bool = False) -> None:
+        self.requests += 1
+        self.errors += 1
+        if timeout:
+            self.timeouts += 1
+        self._record_latency(latency_ms)
+
+    def _record_latency(self, latency_ms: float) -> None:
+        self.last_latency_ms = latency_ms
+        self.latency_sum_ms += latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.latency_buckets[index] += 1
+                return
+        self.latency_buckets[-1] += 1
+
+    def percentile(self, pct: float) -> float | None:
+        """按直方图估算延迟分位数（取所在桶的上限），无样本时为 None"""
+        total = sum(self.latency_buckets)
+        if not total:
+            return None
+        target = total * pct / 100
+        seen = 0
+        for index, count in enumerate(self.latency_buckets):
+            seen += count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return float(LATENCY_BUCKETS_MS[index])
+                return self.latency_max_ms
+        return self.latency_max_ms
+
+    @property
+    def latency_avg_ms(self) -> float | None:
+        return self.latency_sum_ms / self.requests if self.requests else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "circuit_open": self.circuit_open,
+            "hedged": self.hedged,
+            "deadline_exceeded": self.deadline_exceeded,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "bytes_total": self.bytes_total,
+            "last_bytes": self.last_bytes,
+            "last_latency_ms": round(self.last_latency_ms, 1),
+            "latency_avg_ms": round(self.latency_avg_ms, 1) if self.requests else None,
+            "latency_p50_ms": self.percentile(50),
+            "latency_p95_ms": self.percentile(95),
+            "latency_max_ms": round(self.latency_max_ms, 1),
+            "latency_histogram_ms": dict(
+                zip([*map(str, LATENCY_BUCKETS_MS), "inf"], self.latency_buckets)
+            ),
+        }
+
+
+class SxgjdlApiStats:
+    """按接口汇总的统计，挂在 SxgjdlApiClient 上"""
+
+    def __init__(self) -> None:
+        self._endpoints: dict[str, EndpointStats] = {}
+
+    def endpoint(self, path: str) -> EndpointStats:
+        stats = self._endpoints.get(path)
+        if stats is None:
+            stats = self._endpoints[path] = EndpointStats()
+        return stats
+
+    def as_dict(self) -> dict[str, Any]:
+        return {path: stats.as_dict() for path, stats in sorted(self._endpoints.items())}
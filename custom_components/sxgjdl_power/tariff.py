@@ -0,0 +1,182 @@
+"""山西地电用电查询 - 阶梯/分时电价计费"""
+from __future__ import annotations
+
+import calendar
+from collections.abc import Iterable
+from typing import Any
+
+from .model import BillSummary
+
+# 山西居民阶梯电价：年用电量分档上限（kWh）
+TIER_LIMITS = (2160.0, 4200.0)
+# 账单中尚未出现某档单价时，按第一档加价估算（元/kWh）
+TIER_MARKUPS = (0.0, 0.05, 0.30)
+
+TIER_NAMES = ("第一档", "第二档", "第三档")
+# 分时电价名称关键字 -> 分时用电下标（峰, 平, 谷）
+TOU_KEYWORDS = (("峰", 0), ("平", 1), ("谷", 2))
+
+
+def parse_prices(
+    bills: Iterable[BillSummary], unit_price: float | None = None
+) -> tuple[tuple[float, ...], tuple[float, float, float] | None]:
+    """从账单 payDetailList 提取 (各档单价, 峰平谷单价)
+
+    账单按年月倒序，同名电价取最新一期；未出现的档位按 TIER_MARKUPS 估算。
+    账单中没有阶梯电价时按单一电价计费：取平段单价，没有分时电价时取
+    unit_price。没有分时电价时第二项为 None。
+    """
+    tiers: dict[int, float] = {}
+    tou: dict[int, float] = {}
+    for bill in bills:
+        for name, price, _pq in bill.prices:
+            if not price:
+                continue
+            index = next((i for i, kw in enumerate(TIER_NAMES) if kw in name), None)
+            if index is not None:
+                tiers.setdefault(index, price)
+                continue
+            tou_index = next((i for kw, i in TOU_KEYWORDS if kw in name), None)
+            if tou_index is not None:
+                tou.setdefault(tou_index, price)
+            else:
+                # 非阶梯电价（如一般工商业）按第一档处理
+                tiers.setdefault(0, price)
+    tou_prices = (tou[0], tou[1], tou[2]) if len(tou) == 3 else None
+    if not tiers:
+        flat = tou_prices[1] if tou_prices else unit_price
+        return ((flat,), tou_prices) if flat else ((), None)
+    base = tiers.get(0) or min(tiers.values()) - TIER_MARKUPS[min(tiers)]
+    tier_prices = tuple(
+        tiers.get(i, round(base + TIER_MARKUPS[i], 4)) for i in range(len(TIER_NAMES))
+    )
+    return tier_prices, tou_prices
+
+
+class TariffEngine:
+    """按月累计的阶梯电价计费
+
+    reset() 以本年此前各月用电量为起点；之后每个新日期调用一次 add_day()，
+    只根据累计用电量判断所处档位，O(1) 计费，不需要重新遍历整月数据。
+    只有一档单价时为单一电价，不分档。
+    有峰平谷单价且提供当日分时电量时，基础电费按分时计算，阶梯部分只计加价；
+    分时电量晚于日用电量到达时，最近一天可直接重新计费，更早的日期记录在
+    unsplit_days 中，由调用方 reset() 后重新累计。
+    """
+
+    def __init__(self) -> None:
+        self.key: tuple[Any, ...] | None = None
+        self._tiers: tuple[float, ...] = ()
+        self._tou: tuple[float, float, float] | None = None
+        self.year_month = ""
+        self._year_before = 0.0
+        self.month_usage = 0.0
+        self.month_cost = 0.0
+        self.last_ymd = ""
+        self.last_cost = 0.0
+        # 最近一天计入前的 (用电量, 电费)，用于同一天数据被修正时回退
+        self._before_last = (0.0, 0.0)
+        self._last_usage = 0.0
+        self._last_split: tuple[float, float, float] | None = None
+        # 有分时电价但计费时缺少分时电量的日期
+        self.unsplit_days: set[str] = set()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._tiers)
+
+    def reset(
+        self,
+        key: tuple[Any, ...],
+        year_month: str,
+        year_before: float,
+        tiers: tuple[float, ...],
+        tou: tuple[float, float, float] | None,
+    ) -> None:
+        """开始新的计费月（或电价/年初用电量变化后重新计算）"""
+        self.key = key
+        self._tiers = tiers
+        self._tou = tou
+        self.year_month = year_month
+        self._year_before = year_before
+        self.month_usage = 0.0
+        self.month_cost = 0.0
+        self.last_ymd = ""
+        self.last_cost = 0.0
+        self._before_last = (0.0, 0.0)
+        self._last_usage = 0.0
+        self._last_split = None
+        self.unsplit_days = set()
+
+    @property
+    def year_usage(self) -> float:
+        return self._year_before + self.month_usage
+
+    @property
+    def tier_index(self) -> int:
+        usage = self.year_usage
+        index = next((i for i, limit in enumerate(TIER_LIMITS) if usage < limit), len(TIER_LIMITS))
+        return min(index, max(len(self._tiers) - 1, 0))
+
+    @property
+    def tier_name(self) -> str:
+        return TIER_NAMES[self.tier_index]
+
+    @property
+    def marginal_price(self) -> float:
+        return self._tiers[self.tier_index] if self._tiers else 0.0
+
+    def add_day(self, ymd: str, kwh: float, split: tuple[float, float, float] | None = None) -> None:
+        """计入一天的用电量；只接受本计费月且不早于最近一天的数据"""
+        if not self._tiers or ymd[:6] != self.year_month or ymd < self.last_ymd:
+            return
+        if ymd == self.last_ymd:
+            if kwh == self._last_usage and split == self._last_split:
+                return
+            # 同一天的电量被修正或分时电量到达：回退后重新计入
+            self.month_usage, self.month_cost = self._before_last
+        self._before_last = (self.month_usage, self.month_cost)
+        cost = self.cost_of(kwh, split)
+        self.month_usage += kwh
+        self.month_cost += cost
+        self.last_ymd = ymd
+        self.last_cost = cost
+        self._last_usage = kwh
+        self._last_split = split
+        if self._tou and not split:
+            self.unsplit_days.add(ymd)
+        else:
+            self.unsplit_days.discard(ymd)
+
+    def cost_of(self, kwh: float, split: tuple[float, float, float] | None = None) -> float:
+        """从当前累计用电量起再用 kwh 的电费（按档位拆分，最多跨三档）"""
+        if not self._tiers or kwh <= 0:
+            return 0.0
+        base = self._tiers[0]
+        cost = 0.0
+        start = self.year_usage
+        remaining = kwh
+        for index, price in enumerate(self._tiers):
+            # 最后一档不设上限
+            limit = TIER_LIMITS[index] if index < len(self._tiers) - 1 else float("inf")
+            if start >= limit:
+                continue
+            in_band = min(remaining, limit - start)
+            # 有分时电价时基础部分另算，这里只计阶梯加价
+            cost += in_band * (price - base if self._tou and split else price)
+            start += in_band
+            remaining -= in_band
+            if remaining <= 0:
+                break
+        if self._tou and split:
+            total = sum(split) or kwh
+            cost += sum(part / total * kwh * price for part, price in zip(split, self._tou))
+        return cost
+
+    def projected_cost(self) -> float:
+        """按本月已用天数的日均用电推算整月电费"""
+        if not self.last_ymd:
+            return 0.0
+        year, month, day = int(self.last_ymd[:4]), int(self.last_ymd[4:6]), int(self.last_ymd[6:])
+        remaining_days = calendar.monthrange(year, month)[1] - day
+        return self.month_cost + self.cost_of(self.month_usage / day * remaining_days)
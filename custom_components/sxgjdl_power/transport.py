@@ -0,0 +1,249 @@
+"""山西地电用电查询 - HTTP 传输层与录制/回放
+
+SxgjdlApiClient 通过传输层发出请求，默认直接访问服务器（HttpTransport）。
+离线复现线上行为时可替换为：
+
+- CassetteRecorder：包装真实传输，把每次请求/响应追加写入 gzip 压缩的
+  JSON Lines 录制文件；
+- CassetteReplayer：按录制文件确定性地回放，不访问网络、不等待；
+  配合 SimulatedClock 使用时按模拟时间回放（time-warp），可在几秒内
+  跑完一个月的刷新。
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import gzip
+import json
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+
+# 单次请求超时（秒）
+REQUEST_TIMEOUT = 15
+# 录制时每累积这么多条记录写入一个 gzip 段（段越大压缩率越高）
+CASSETTE_FLUSH_RECORDS = 64
+# 录制文件中可回放的网络错误
+_REPLAYABLE_ERRORS = ("timeout", "connection")
+
+
+def request_key(path: str, params: dict[str, Any]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    """请求的匹配键：接口 + 排序后的参数"""
+    return path, tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+class SxgjdlTransport:
+    """传输层基类：发出请求并提供时钟"""
+
+    async def fetch(self, path: str, params: dict[str, Any]) -> tuple[int, bytes]:
+        """返回 (HTTP 状态码, 响应体)；网络错误直接抛出"""
+        raise NotImplementedError
+
+    def now(self) -> datetime:
+        """当前本地时间（回放时为模拟时间）"""
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        """单调时钟（秒），用于缓存有效期判断"""
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        """重试退避等待"""
+        await asyncio.sleep(seconds)
+
+    async def close(self) -> None:
+        """释放传输层资源（客户端关闭时调用）"""
+
+
+class HttpTransport(SxgjdlTransport):
+    """直接请求服务器"""
+
+    def __init__(
+        self,
+        get_session: Callable[[], Awaitable[aiohttp.ClientSession]],
+        base_url: str,
+    ) -> None:
+        self._get_session = get_session
+        self._base_url = base_url
+
+    async def fetch(self, path: str, params: dict[str, Any]) -> tuple[int, bytes]:
+        session = await self._get_session()
+        async with session.get(
+            self._base_url + path,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        ) as resp:
+            return resp.status, await resp.read()
+
+
+class SimulatedClock:
+    """可手动推进的模拟时钟"""
+
+    def __init__(self, start: datetime) -> None:
+        self._start = start
+        self._elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def advance(self, delta: timedelta) -> None:
+        self._elapsed += delta.total_seconds()
+
+
+# ---------------------------------------------------------------------- #
+#  录制                                                                    #
+# ---------------------------------------------------------------------- #
+
+class CassetteRecorder(SxgjdlTransport):
+    """包装真实传输，把每次请求/响应追加到录制文件（gzip JSON Lines）
+
+    每条记录：t（本地时间）、path、params、ms（耗时），以及 status/body，
+    或网络错误时的 error（timeout / connection）。被取消的请求（如对冲请求
+    中落后的一方）没有结果，不录制。记录先缓冲，每 CASSETTE_FLUSH_RECORDS 条
+    或 close() 时作为一个 gzip 段写入，不能省略 close()。
+    """
+
+    def __init__(self, inner: SxgjdlTransport, cassette: str | Path) -> None:
+        self._inner = inner
+        self._path = Path(cassette)
+        self._lock = asyncio.Lock()
+        self._buffer: list[str] = []
+
+    def now(self) -> datetime:
+        return self._inner.now()
+
+    def monotonic(self) -> float:
+        return self._inner.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await self._inner.sleep(seconds)
+
+    async def fetch(self, path: str, params: dict[str, Any]) -> tuple[int, bytes]:
+        record: dict[str, Any] = {
+            "t": self.now().isoformat(timespec="seconds"),
+            "path": path,
+            "params": {k: str(v) for k, v in params.items()},
+        }
+        start = time.monotonic()
+        try:
+            status, body = await self._inner.fetch(path, params)
+        except asyncio.TimeoutError:
+            record["error"] = "timeout"
+            raise
+        except aiohttp.ClientError as err:
+            record["error"] = "connection"
+            record["message"] = str(err)
+            raise
+        else:
+            record["status"] = status
+            record["body"] = body.decode("utf-8", errors="replace")
+            return status, body
+        finally:
+            # 取消时既无结果也无错误，不写入
+            if "status" in record or "error" in record:
+                record["ms"] = round((time.monotonic() - start) * 1000, 1)
+                self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+                if len(self._buffer) >= CASSETTE_FLUSH_RECORDS:
+                    await self._flush()
+
+    async def close(self) -> None:
+        await self._flush()
+        await self._inner.close()
+
+    async def _flush(self) -> None:
+        async with self._lock:
+            lines, self._buffer = self._buffer, []
+            if lines:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        with gzip.open(self._path, "at", encoding="utf-8") as file:
+            file.writelines(lines)
+
+
+# ---------------------------------------------------------------------- #
+#  回放                                                                    #
+# ---------------------------------------------------------------------- #
+
+def load_cassette(cassette: str | Path) -> list[dict[str, Any]]:
+    """读取录制文件（阻塞 I/O，在 HA 中请放到执行器中调用）"""
+    with gzip.open(cassette, "rt", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class CassetteReplayer(SxgjdlTransport):
+    """按录制文件回放响应
+
+    没有结果的记录（旧版录制的被取消请求等）在加载时忽略。
+    默认模式：同一请求按录制顺序依次返回，录完后重复最后一条，
+    结果与调用时刻无关、完全确定。
+    time-warp 模式（传入 clock）：返回录制时间不晚于模拟时间的最近一条，
+    模拟时间早于首条录制时返回首条。
+    replay_latency=True 时按录制耗时等待（用于延迟基准）。
+    """
+
+    def __init__(
+        self,
+        entries: list[dict[str, Any]],
+        clock: SimulatedClock | None = None,
+        replay_latency: bool = False,
+    ) -> None:
+        self._clock = clock
+        self._replay_latency = replay_latency
+        self._entries: dict[tuple, list[dict[str, Any]]] = {}
+        for entry in entries:
+            if "status" not in entry and entry.get("error") not in _REPLAYABLE_ERRORS:
+                continue
+            self._entries.setdefault(request_key(entry["path"], entry["params"]), []).append(entry)
+        # time-warp 按录制时间二分查找
+        self._times = {
+            key: [datetime.fromisoformat(e["t"]) for e in items]
+            for key, items in self._entries.items()
+        }
+        self._cursor: dict[tuple, int] = {}
+        self.misses = 0
+
+    def now(self) -> datetime:
+        return self._clock.now() if self._clock else datetime.now()
+
+    def monotonic(self) -> float:
+        return self._clock.monotonic() if self._clock else time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        # 全速回放：退避不等待
+        if self._replay_latency:
+            await asyncio.sleep(seconds)
+        else:
+            await asyncio.sleep(0)
+
+    def _select(self, key: tuple) -> dict[str, Any] | None:
+        items = self._entries.get(key)
+        if not items:
+            return None
+        if self._clock is not None:
+            index = bisect.bisect_right(self._times[key], self._clock.now()) - 1
+            return items[max(index, 0)]
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = min(index + 1, len(items) - 1)
+        return items[index]
+
+    async def fetch(self, path: str, params: dict[str, Any]) -> tuple[int, bytes]:
+        entry = self._select(request_key(path, params))
+        if entry is None:
+            self.misses += 1
+            raise LookupError(f"录制文件中没有请求 {path} {params}")
+        if self._replay_latency and entry.get("ms"):
+            await asyncio.sleep(entry["ms"] / 1000)
+        error = entry.get("error")
+        if error == "timeout":
+            raise asyncio.TimeoutError
+        if error:
+            raise aiohttp.ClientConnectionError(entry.get("message", error))
+        return entry["status"], entry["body"].encode("utf-8")
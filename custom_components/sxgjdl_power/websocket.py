@@ -0,0 +1,189 @@
+"""山西地电用电查询 - WebSocket 历史数据查询
+
+仪表盘卡片按需分页拉取每日/月度/账单序列，数据只来自本地缓存
+（协调器快照 + 已结算周期的历史缓存），不请求服务器，也不进入状态属性。
+
+示例：
+    {"type": "sxgjdl_power/history", "series": "daily",
+     "start": "2026-01-01", "end": "2026-03-31", "limit": 100}
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    DOMAIN,
+    CONF_CONS_NO,
+    API_RECORD_LIST,
+    API_LIST_BY_YEAR,
+    API_DAYS_OF_MONTH,
+    API_DAYS_ONLY,
+    SERIES_DAILY,
+    SERIES_MONTHLY,
+    SERIES_BILLS,
+    HISTORY_SERIES,
+)
+from .coordinator import SxgjdlDataCoordinator
+from .model import BillSummary
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """注册 WebSocket 命令"""
+    websocket_api.async_register_command(hass, websocket_history)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/history",
+        vol.Optional(CONF_CONS_NO): cv.string,
+        vol.Required("series"): vol.In(HISTORY_SERIES),
+        vol.Optional("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("offset", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("limit", default=DEFAULT_PAGE_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_PAGE_SIZE)
+        ),
+    }
+)
+@callback
+def websocket_history(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """按时间升序分页返回某个户号的历史序列"""
+    coordinators: list[SxgjdlDataCoordinator] = list(hass.data.get(DOMAIN, {}).values())
+    cons_no = msg.get(CONF_CONS_NO)
+    if cons_no:
+        coordinators = [c for c in coordinators if c.client.cons_no == cons_no]
+    if len(coordinators) != 1:
+        connection.send_error(
+            msg["id"],
+            websocket_api.const.ERR_NOT_FOUND,
+            f"未找到户号 {cons_no}" if cons_no else "有多个户号，请指定 cons_no",
+        )
+        return
+
+    start: date | None = msg.get("start")
+    end: date | None = msg.get("end")
+    builder = {
+        SERIES_DAILY: _daily_series,
+        SERIES_MONTHLY: _monthly_series,
+        SERIES_BILLS: _bill_series,
+    }[msg["series"]]
+    items = builder(coordinators[0], start, end)
+
+    offset, limit = msg["offset"], msg["limit"]
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(items) else None
+    connection.send_result(
+        msg["id"],
+        {
+            "cons_no": coordinators[0].client.cons_no,
+            "series": msg["series"],
+            "total": len(items),
+            "offset": offset,
+            "next_offset": next_offset,
+            "items": page,
+        },
+    )
+
+
+def _bounds(start: date | None, end: date | None, fmt: str) -> tuple[str, str]:
+    """日期范围 -> 可直接按字符串比较的 (起, 止)；未指定的一端不限"""
+    return (
+        start.strftime(fmt) if start else "",
+        end.strftime(fmt) if end else "9",
+    )
+
+
+# ---------------------------------------------------------------------- #
+#  序列组装：历史缓存（已结算周期）+ 快照（近期数据），后者覆盖前者        #
+# ---------------------------------------------------------------------- #
+
+def _daily_series(coordinator: SxgjdlDataCoordinator, start: date | None, end: date | None) -> list[dict[str, Any]]:
+    first, last = _bounds(start, end, "%Y%m%d")
+    tou = coordinator.history.cached_payloads(API_DAYS_ONLY)
+    days: dict[str, float] = {}
+    # 分时缓存（如补录分时统计时查询的日期）本身带当日总电量，
+    # 每日用电缓存和快照中没有的日期也从这里取
+    for ymd, payload in tou.items():
+        total = (payload.get("data") or {}).get("totalPq")
+        if total is not None and first <= ymd <= last:
+            days[ymd] = total
+    for payload in coordinator.history.cached_payloads(API_DAYS_OF_MONTH).values():
+        for entry in payload.get("data") or []:
+            ymd = entry.get("ymd", "")
+            if entry.get("dayEstiPq") is not None and first <= ymd <= last:
+                days[ymd] = entry["dayEstiPq"]
+    if coordinator.data is not None:
+        for ymd, pq in coordinator.data.daily.since(first or "0"):
+            if ymd > last:
+                break
+            days[ymd] = pq
+
+    items: list[dict[str, Any]] = []
+    for ymd in sorted(days):
+        item: dict[str, Any] = {"date": ymd, "usage_kwh": days[ymd]}
+        detail = (tou.get(ymd) or {}).get("data")
+        if detail:
+            item["peak_kwh"] = detail.get("peakPq")
+            item["flat_kwh"] = detail.get("flatPq")
+            item["valley_kwh"] = detail.get("valleyPq")
+        items.append(item)
+    return items
+
+
+def _monthly_series(coordinator: SxgjdlDataCoordinator, start: date | None, end: date | None) -> list[dict[str, Any]]:
+    first, last = _bounds(start, end, "%Y%m")
+    months: dict[str, tuple[float, float]] = {}
+    for year, payload in coordinator.history.cached_payloads(API_RECORD_LIST).items():
+        for rec in (payload.get("data") or {}).get("recordList", []):
+            month = rec.get("month", 0)
+            if 1 <= month <= 12:
+                months[f"{year}{month:02d}"] = (rec.get("thisPq", 0), rec.get("prices", 0.0))
+    snapshot = coordinator.data
+    if snapshot is not None and snapshot.record_year is not None:
+        for month, usage, amt in snapshot.monthly():
+            months[f"{snapshot.record_year}{month:02d}"] = (usage, amt)
+    return [
+        {"month": ym, "usage_kwh": usage, "amount_yuan": amt}
+        for ym, (usage, amt) in sorted(months.items())
+        if first <= ym <= last
+    ]
+
+
+def _bill_series(coordinator: SxgjdlDataCoordinator, start: date | None, end: date | None) -> list[dict[str, Any]]:
+    first, last = _bounds(start, end, "%Y%m")
+    bills: dict[str, BillSummary] = {}
+    for payload in coordinator.history.cached_payloads(API_LIST_BY_YEAR).values():
+        for bill in payload.get("data") or []:
+            summary = BillSummary.from_payload(bill)
+            bills[summary.ym] = summary
+    if coordinator.data is not None:
+        for summary in coordinator.data.bills:
+            bills[summary.ym] = summary
+    return [
+        {
+            "month": ym,
+            "amount_yuan": bill.amt,
+            "usage_kwh": bill.pq,
+            "prices": [
+                {"name": name, "price": price, "usage_kwh": pq}
+                for name, price, pq in bill.prices
+            ],
+        }
+        for ym, bill in sorted(bills.items())
+        if first <= ym <= last
+    ]